@@ -7,19 +7,40 @@ matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import ipaddress
+import math
+try:
+    import numba
+except ImportError:
+    numba = None
 
 SERVER_PORT = 8080
 
 
 
+TSHARK_FIELDS = ["frame.time_epoch", "frame.number", "frame.len", "ip.src", "tcp.srcport", "udp.srcport",
+                 "ip.dst", "tcp.dstport", "udp.dstport", "tcp.len", "udp.length", "_ws.col.Protocol"]
+IO_BUFFER_SIZE = 1 << 20
+
+
 def convert_pcap_to_csv(file_path, output_path=None):
     import os
+    import shutil
+    import subprocess
     if output_path is None:
         output_path = file_path.replace(".pcap", ".csv")
         if os.path.isfile(output_path):
             return output_path
-    os.system(
-        "tshark -r " + file_path + " -Y 'not icmp' -T fields -e frame.time_epoch -e frame.number -e frame.len -e ip.src -e tcp.srcport -e udp.srcport -e ip.dst -e tcp.dstport -e udp.dstport -e tcp.len -e udp.length -e _ws.col.Protocol -E header=y -E separator=',' > " + output_path)
+    cmd = ["tshark", "-r", file_path, "-n", "-o", "nameres.mac_name:FALSE",
+           "-Y", "not icmp", "-T", "fields"]
+    for field in TSHARK_FIELDS:
+        cmd += ["-e", field]
+    cmd += ["-E", "header=y", "-E", "separator=,"]
+    # Stream tshark output straight into the CSV with large buffers, no shell in between
+    with open(output_path, "wb", buffering=IO_BUFFER_SIZE) as fout:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=IO_BUFFER_SIZE)
+        shutil.copyfileobj(proc.stdout, fout, length=IO_BUFFER_SIZE)
+        proc.stdout.close()
+        proc.wait()
     return output_path
 
 def check_if_file_is_csv(file_path):
@@ -33,10 +54,14 @@ def check_if_file_is_csv(file_path):
     else:
         return False
 
-def check_file_list(file_list):
+def check_file_list(file_list, max_workers=None):
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    # Each pcap conversion runs in its own tshark process, so threads are enough to keep all cores busy
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        csv_files = list(executor.map(check_if_file_is_csv, file_list))
     out_list = []
-    for file in file_list:
-        csv_file = check_if_file_is_csv(file)
+    for file, csv_file in zip(file_list, csv_files):
         if csv_file:
             out_list.append(csv_file)
         else:
@@ -51,13 +76,20 @@ def set_server_port(port):
 def get_server_port():
     return SERVER_PORT
 
-def load_df(file_path):
+def load_df(file_path, engine=None):
+    # engine='pyarrow' parses the CSV multi-threaded; the default C engine is kept otherwise
     import pandas as pd
-    df = pd.read_csv(file_path, sep=',')
+    df = pd.read_csv(file_path, sep=',', engine=engine)
     df['frame.time'] = df['frame.time_epoch'] - df['frame.time_epoch'].iloc[0]
     return df
 
 
+def ip_to_uint32(ips):
+    # Dotted-quad strings to uint32, unparsable/missing values become 0
+    parts = ips.astype(str).str.extract(r'^(\d+)\.(\d+)\.(\d+)\.(\d+)').fillna(0).to_numpy(dtype=np.uint32)
+    return (parts[:, 0] << 24) | (parts[:, 1] << 16) | (parts[:, 2] << 8) | parts[:, 3]
+
+
 def extract_flows(df, port,server_ip=None):
     import pandas as pd
     import numpy as np
@@ -65,110 +97,111 @@ def extract_flows(df, port,server_ip=None):
 
     filtered_df = df.loc[(df['tcp.srcport'] == port) | (df['tcp.dstport'] == port)]
     # filtered_df = filtered_df.dropna()
+    # Sort once (stable) so groupby(sort=False) yields every flow already ordered, no per-flow sort
+    filtered_df = filtered_df.sort_values(by=['frame.number'], kind='mergesort')
     if server_ip is None:
-        grouped_df = filtered_df.groupby(['tcp.srcport', 'tcp.dstport'])
-
-        unique_names = pd.concat([df['tcp.srcport'], df['tcp.dstport']]).unique()
-
-        unique_names = unique_names[~np.isnan(unique_names)]
+        ports = np.concatenate([df['tcp.srcport'].to_numpy(dtype=float), df['tcp.dstport'].to_numpy(dtype=float)])
 
-        unique_names = unique_names.astype(int)
+        unique_names = pd.unique(ports[np.isfinite(ports)]).astype(int)
 
         unique_names = unique_names[unique_names != port]
 
-        flow_list = []
-        for elem in unique_names:
-            group_1 = grouped_df.get_group((elem, port))
-            group_2 = grouped_df.get_group((port, elem))
-            merged_group = pd.concat([group_1, group_2]).sort_values(by=['frame.number'])
-            flow_list.append(merged_group)
+        # Both directions of a flow share the same peer (the non-server endpoint)
+        peer = np.where(filtered_df['tcp.srcport'] == port, filtered_df['tcp.dstport'], filtered_df['tcp.srcport'])
 
-        return flow_list
+        flows = dict(tuple(filtered_df.groupby(peer, sort=False)))
+        return [flows[elem] for elem in unique_names if elem in flows]
     else:
+        # Compare and group IPs as uint32 instead of dotted strings
+        server = int(ipaddress.IPv4Address(server_ip))
+        src = ip_to_uint32(filtered_df['ip.src'])
+        dst = ip_to_uint32(filtered_df['ip.dst'])
+        peer = np.where(src == server, dst, src)
 
-        grouped_df = filtered_df.groupby(['ip.src', 'ip.dst'])
-
-        unique_names_t = pd.concat([df['ip.src'], df['ip.dst']]).unique()
-
-        unique_names_q = [x for x in unique_names_t if str(x) != 'nan']
-
-        unique_names = [x for x in unique_names_q if str(x).startswith('10.0.')]
-
-        unique_names = [x for x in unique_names if str(x) != server_ip]
-
-        #unique_names = unique_names.tolist()
-
-        flow_list = []
-        for elem in unique_names:
-            group_1 = grouped_df.get_group((str(elem), server_ip))
-            group_2 = grouped_df.get_group((server_ip, str(elem)))
-            merged_group = pd.concat([group_1, group_2]).sort_values(by=['frame.number'])
-            flow_list.append(merged_group)
+        # keep only packets to/from the server, with 10.0.x.x peers other than the server
+        mask = ((src == server) | (dst == server)) & ((peer >> 16) == 0x0A00) & (peer != server)
+        flows = dict(tuple(filtered_df.loc[mask].groupby(peer[mask], sort=False)))
 
-        return flow_list
+        # Flows in the order the peers first appear in ip.src, then ip.dst
+        unique_names = pd.unique(np.concatenate([ip_to_uint32(df['ip.src']), ip_to_uint32(df['ip.dst'])]))
+        unique_names = unique_names[((unique_names >> 16) == 0x0A00) & (unique_names != server)]
+        return [flows[elem] for elem in unique_names if elem in flows]
 
 
 # %%
 def split_comm_flows(df, treshold):
-    store_df = pd.DataFrame()
-    list_of_flows = [store_df]
     df_time_diff = df.copy()
     df_time_diff['time.diff'] = df['frame.time'].diff()
     df_time_diff = df_time_diff.fillna(0)
-    for index, row in df_time_diff.iterrows():
-        if row['time.diff'] < treshold:
-            list_of_flows[-1] = pd.concat([list_of_flows[-1], row.to_frame().T])
-        else:
-            store_df = row.to_frame().T
-            list_of_flows.append(store_df)
+    # A new flow starts at every gap of at least `treshold`
+    flow_id = (df_time_diff['time.diff'].to_numpy() >= treshold).cumsum()
+    list_of_flows = [flow for _, flow in df_time_diff.groupby(flow_id, sort=False)]
+    if len(flow_id) == 0 or flow_id[0] > 0:
+        list_of_flows.insert(0, pd.DataFrame())
     return list_of_flows
 
 
-def extract_feat(df):
-    df_res = pd.DataFrame()
-
-    df_res['count'] = [df['frame.number'].count()]
+FEAT_STATS = {
+    'frame.time': ['mean', 'std', 'min', 'max', 'median'],
+    'frame.len': ['mean', 'std', 'min', 'max', 'sum', 'median'],
+    'tcp.len': ['mean', 'std', 'min', 'max', 'sum', 'median'],
+}
 
-    df_res['frame.time.mean'] = [df['frame.time'].mean()]
-    df_res['frame.time.std'] = [df['frame.time'].std()]
-    df_res['frame.time.min'] = [df['frame.time'].min()]
-    df_res['frame.time.max'] = [df['frame.time'].max()]
-    df_res['frame.time.median'] = [df['frame.time'].median()]
-    df_res['frame.time.deltat'] = [df['frame.time'].max() - df['frame.time'].min()]
-    df_res['frame.time.deltaoff'] = [df['frame.time'].diff().max()]
 
-    df_res['frame.len.mean'] = [df['frame.len'].mean()]
-    df_res['frame.len.std'] = [df['frame.len'].std()]
-    df_res['frame.len.min'] = [df['frame.len'].min()]
-    df_res['frame.len.max'] = [df['frame.len'].max()]
-    df_res['frame.len.sum'] = [df['frame.len'].sum()]
-    df_res['frame.len.median'] = [df['frame.len'].median()]
+def _col_stats(vals):
+    # NumPy reductions on the raw array, skipping NaN like pandas does;
+    # integer columns keep integer min/max/sum, as with pandas
+    if vals.dtype.kind == 'f':
+        vals = vals[~np.isnan(vals)]
+    if vals.size == 0:
+        return {'mean': np.nan, 'std': np.nan, 'min': np.nan, 'max': np.nan, 'median': np.nan, 'sum': vals.sum()}
+    return {
+        'mean': vals.mean(),
+        'std': vals.std(ddof=1) if vals.size > 1 else np.nan,
+        'min': vals.min(),
+        'max': vals.max(),
+        'median': np.median(vals),
+        'sum': vals.sum(),
+    }
 
-    df_res['tcp.len.mean'] = [df['tcp.len'].mean()]
-    df_res['tcp.len.std'] = [df['tcp.len'].std()]
-    df_res['tcp.len.min'] = [df['tcp.len'].min()]
-    df_res['tcp.len.max'] = [df['tcp.len'].max()]
-    df_res['tcp.len.sum'] = [df['tcp.len'].sum()]
-    df_res['tcp.len.median'] = [df['tcp.len'].median()]
 
-    return df_res
+def extract_feat(df):
+    res = {'count': df['frame.number'].count()}
+    for col, col_stats in FEAT_STATS.items():
+        vals = df[col].to_numpy()
+        if vals.dtype.kind not in 'iu':
+            vals = vals.astype(np.float64)
+        stats = _col_stats(vals)
+        for stat in col_stats:
+            res[f'{col}.{stat}'] = stats[stat]
+        if col == 'frame.time':
+            res['frame.time.deltat'] = stats['max'] - stats['min']
+            diffs = np.diff(vals)
+            diffs = diffs[~np.isnan(diffs)]
+            res['frame.time.deltaoff'] = diffs.max() if diffs.size else np.nan
+
+    return res
 
 
 def extract_feat_list(list_of_flows):
-    df_res = pd.DataFrame()
-    for flow in list_of_flows:
-        df_res = pd.concat([df_res, extract_feat(flow)], axis=0, ignore_index=True)
-    return df_res
+    records = [extract_feat(flow) for flow in list_of_flows]
+    return pd.DataFrame.from_records(records)
+
+def _sum_meas_kernel(x, e):
+    w = 1.0 / (e * e)
+    return (x * w).sum() / w.sum(), math.sqrt(1.0 / (e * e).sum())
+
+if numba is not None:
+    _sum_meas_kernel = numba.njit(cache=True, error_model='numpy')(_sum_meas_kernel)
 
 def sum_meas (x,e):
 
     # Create an array of measurements and errors
-    x = np.array(x)
-    e = np.array(e)
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    e = np.ascontiguousarray(e, dtype=np.float64)
 
     # Calculate the weighted mean and uncertainty
-    x_m = np.sum(x / e**2) / np.sum(1 / e**2)
-    std_m= np.sqrt(1 / np.sum(e**2))
+    x_m, std_m = _sum_meas_kernel(x, e)
 
     return x_m,std_m
 
@@ -209,11 +242,6 @@ def print_feat(df, name, bins, components, min=None, max=None, log=False, plt_hi
 
     data = np.array(df_plot[name])
 
-    # Fit a mixture of two normal distributions
-    from sklearn.mixture import GaussianMixture
-    gmm = GaussianMixture(n_components=components)
-    gmm.fit(data.reshape(-1, 1))
-
     if norm_bin is True:
         bin_norm = int((data.max() - data.min()) / bins)
     else:
@@ -237,10 +265,7 @@ def print_feat(df, name, bins, components, min=None, max=None, log=False, plt_hi
         if compare_with is not None:
             plt.hist(data_1, bins=bin_norm, density=True, label=label+'_compared')
 
-    # Overlay the fitted mixture of two normal distributions
-    x = np.linspace(data.min(), data.max(), len(data))
-    y = np.exp(gmm.score_samples(x.reshape(-1, 1)))
-    #plt.plot(x, y, linewidth=2, label=label)
+    # Overlay the KDE of the data
     sns.distplot(data, hist=False, kde=True, rug=True,
                  color='darkblue',
                  kde_kws={'linewidth': 2})
@@ -285,7 +310,7 @@ def print_feat_list(list, name, bins, components, min=None, max=None, log=False,
 
     import matplotlib.pyplot as plt
     import numpy as np
-    from scipy.stats import norm
+    from scipy.stats import gaussian_kde
 
     if fig_name is None:
         fig_name = name+'_list'
@@ -295,7 +320,7 @@ def print_feat_list(list, name, bins, components, min=None, max=None, log=False,
     plt.figure(fig_name)
     plt.title(fig_name)
     res_list = resize_list_minmax(list,name)
-    np_list = []
+    data_list = []
     for df in res_list:
         # Plot the histogram
         if min:
@@ -305,38 +330,39 @@ def print_feat_list(list, name, bins, components, min=None, max=None, log=False,
         else:
             df_plot = df
 
-        data = np.array(df_plot[name])
+        data_list.append(np.array(df_plot[name]))
 
+    # Evaluate every KDE on one shared grid so the curves can be stacked directly
+    all_data = np.concatenate(data_list)
+    if all_data.size:
+        grid = np.linspace(all_data.min(), all_data.max(), 200)
+    np_list = []
+    for data in data_list:
         if plt_hist is True:
             plt.hist(data, bins=bins, density=True, label=label)
             plt_hist = False
 
-        # Fit a mixture of two normal distributions
-        from sklearn.mixture import GaussianMixture
-        gmm = GaussianMixture(n_components=components)
-        gmm.fit(data.reshape(-1, 1))
-
-        kde = sns.kdeplot(data=data)
-        x, y = kde.get_lines()[0].get_data()
-
-        # # Overlay the fitted mixture of two normal distributions
-        # x = np.linspace(data.min(), data.max(), len(data))
-        # y = np.exp(gmm.score_samples(x.reshape(-1, 1)))
+        # gaussian_kde needs at least two distinct points (non-singular covariance)
+        if data.size < 2 or np.ptp(data) == 0:
+            continue
+        y = gaussian_kde(data)(grid)
+        plt.plot(grid, y)
         np_list.append(y)
 
 
-    np_plot = np.array(np_list)
+    if np_list:
+        np_plot = np.array(np_list)
 
-    mu = np_plot.mean(axis=0)
-    sigma = np_plot.std(axis=0)
+        mu = np_plot.mean(axis=0)
+        sigma = np_plot.std(axis=0)
 
-    x = np.linspace(1, len(mu), len(mu))
-    X1_plus_sigma = mu + sigma
-    X1_minus_sigma = mu - sigma
+        x = grid
+        X1_plus_sigma = mu + sigma
+        X1_minus_sigma = mu - sigma
 
-    plt.figure(fig_name+'tt')
-    plt.plot(x, mu, label=label)
-    plt.fill_between(x, X1_plus_sigma, X1_minus_sigma, alpha=0.2)
+        plt.figure(fig_name+'tt')
+        plt.plot(x, mu, label=label)
+        plt.fill_between(x, X1_plus_sigma, X1_minus_sigma, alpha=0.2)
 
     if xlabel is not None:
         plt.xlabel(xlabel)
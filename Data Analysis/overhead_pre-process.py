@@ -1,15 +1,10 @@
 # %%
 import os, glob, re
 from typing import Dict
-import pyshark
-import asyncio
-import nest_asyncio
 import pandas as pd
 import pickle
 from pathlib import Path
-
-# Apply the patch
-nest_asyncio.apply()
+from concurrent.futures import ProcessPoolExecutor
 
 _ROUNDS_RE = re.compile(
     r"""Round\s+(\d+),\s+time\s+for\s+\d+\s+is\s+[0-9]*\.?[0-9]+""",
@@ -19,6 +14,19 @@ _ROUNDS_RE = re.compile(
 # remove a trailing «-<letters+digits>»  (e.g. -eth0, -wlan1, -lo)
 _IFACE_TAIL = re.compile(r"-[a-zA-Z]+[0-9]*$")
 
+# righe lette per blocco in get_flow_stats
+CSV_CHUNKSIZE = 1_000_000
+
+# buffer di lettura dei log (1 MiB ➜ meno syscall read)
+LOG_BUFFER_SIZE = 1 << 20
+
+# True ➜ parser CSV multi-thread di pyarrow (file intero in memoria, niente blocchi)
+USE_PYARROW = False
+
+# True ➜ calcola i flussi direttamente dai .pcap con NFStream (salta tshark ➜ CSV)
+USE_NFSTREAM = False
+SERVER_IP = "10.0.0.100"
+
 
 import os
 import subprocess
@@ -33,23 +41,45 @@ def get_flow_stats(pcap_path: str) -> pd.DataFrame:
         return pd.DataFrame(columns=["ip_src", "ip_dst", "bytes"])
 
     try:
-        # 1. carica il CSV
-        df = pd.read_csv(pcap_path, na_filter=False)        # mantieni stringhe vuote
-
-        # 2. uniforma i nomi colonna: ip.src ➜ ip_src, ip.dst ➜ ip_dst
-        df.columns = [c.replace(".", "_") for c in df.columns]
+        # 1. verifica l'intestazione senza caricare il file
+        header = pd.read_csv(pcap_path, nrows=0).columns
+        cols = {c.replace(".", "_"): c for c in header}
 
         required = {"ip_src", "ip_dst", "frame_len"}
-        if not required.issubset(df.columns):
-            raise ValueError(f"Mancano colonne: {required - set(df.columns)}")
+        if not required.issubset(cols):
+            raise ValueError(f"Mancano colonne: {required - set(cols)}")
+
+        # 2. leggi solo le colonne utili, a blocchi, per limitare la memoria
+        read_kwargs = dict(
+            usecols=[cols["ip_src"], cols["ip_dst"], cols["frame_len"]],
+            dtype={cols["ip_src"]: "category", cols["ip_dst"]: "category"},  # hash sui codici, non sulle stringhe
+            na_filter=False,                                 # mantieni stringhe vuote
+        )
+        if USE_PYARROW:
+            reader = [pd.read_csv(pcap_path, engine="pyarrow", **read_kwargs)]
+        else:
+            reader = pd.read_csv(pcap_path, chunksize=CSV_CHUNKSIZE, **read_kwargs)
 
-        # 3. filtra solo traffico verso 10.0.0.100 da sorgenti diverse
-        mask = (df["ip_dst"] == "10.0.0.100") & (df["ip_src"] != "10.0.0.100")
-        df_filtered = df.loc[mask, ["ip_src", "ip_dst", "frame_len"]]
+        partials = []
+        for chunk in reader:
+            # uniforma i nomi colonna: ip.src ➜ ip_src, ip.dst ➜ ip_dst
+            chunk.columns = [c.replace(".", "_") for c in chunk.columns]
 
-        # 4. aggrega per flusso e rinomina
+            # 3. filtra solo traffico verso 10.0.0.100 da sorgenti diverse
+            mask = (chunk["ip_dst"] == "10.0.0.100") & (chunk["ip_src"] != "10.0.0.100")
+            partials.append(
+                chunk.loc[mask]
+                .groupby(["ip_src", "ip_dst"], as_index=False, observed=True, sort=False)["frame_len"]
+                .sum()
+            )
+
+        if not partials:
+            return pd.DataFrame(columns=["ip_src", "ip_dst", "bytes"])
+
+        # 4. aggrega i parziali per flusso e rinomina
         flows = (
-            df_filtered.groupby(["ip_src", "ip_dst"], as_index=False)["frame_len"]
+            pd.concat(partials, ignore_index=True)
+            .groupby(["ip_src", "ip_dst"], as_index=False, observed=True)["frame_len"]
             .sum()
             .rename(columns={"frame_len": "bytes"})
         )
@@ -59,18 +89,51 @@ def get_flow_stats(pcap_path: str) -> pd.DataFrame:
         print(f"[error] Failed to process PCAP {pcap_path}: {e}")
         return pd.DataFrame(columns=["ip_src", "ip_dst", "bytes"])
 
+def get_flow_stats_nfstream(pcap_path: str) -> pd.DataFrame:
+    """
+    Come get_flow_stats, ma legge direttamente il .pcap con NFStream.
+    Conta solo i byte (livello link, come frame.len) inviati verso SERVER_IP.
+    """
+    if not os.path.isfile(pcap_path):
+        print(f"[warn] PCAP file not found: {pcap_path}")
+        return pd.DataFrame(columns=["ip_src", "ip_dst", "bytes"])
+
+    try:
+        from nfstream import NFStreamer
+
+        flows = NFStreamer(source=pcap_path, statistical_analysis=True, n_dissections=0).to_pandas()
+
+        # il flusso è bidirezionale: prendi la direzione client ➜ server
+        to_srv = flows.loc[(flows["dst_ip"] == SERVER_IP) & (flows["src_ip"] != SERVER_IP)]
+        from_srv = flows.loc[(flows["src_ip"] == SERVER_IP) & (flows["dst_ip"] != SERVER_IP)]
+        df = pd.concat([
+            pd.DataFrame({"ip_src": to_srv["src_ip"], "ip_dst": SERVER_IP, "bytes": to_srv["src2dst_bytes"]}),
+            pd.DataFrame({"ip_src": from_srv["dst_ip"], "ip_dst": SERVER_IP, "bytes": from_srv["dst2src_bytes"]}),
+        ], ignore_index=True)
+
+        return df.groupby(["ip_src", "ip_dst"], as_index=False)["bytes"].sum()
+
+    except Exception as e:
+        print(f"[error] Failed to process PCAP {pcap_path}: {e}")
+        return pd.DataFrame(columns=["ip_src", "ip_dst", "bytes"])
+
 def _base_stem(path: str) -> str:
     """Stem without interface suffix."""
     stem = os.path.splitext(os.path.basename(path))[0]
     return _IFACE_TAIL.sub("", stem)
 
 def _round_stats(log_path: str) -> tuple[int, int]:
-    txt = open(log_path, encoding="utf-8").read()
-    ids = [int(m.group(1)) for m in _ROUNDS_RE.finditer(txt)]
+    ids = []
+    with open(log_path, encoding="utf-8", buffering=LOG_BUFFER_SIZE) as f:
+        for line in f:
+            # substring test is far cheaper than the regex: skip lines without a round marker
+            if "Round" in line:
+                ids.extend(int(m.group(1)) for m in _ROUNDS_RE.finditer(line))
     return len(set(ids)), len(ids)
 
 def analyze_federated_learning_data(folder: str) -> Dict[str, Dict]:
-    pcaps = glob.glob(os.path.join(folder, "*ps_fed_opt0*.csv"))
+    ext = "pcap" if USE_NFSTREAM else "csv"
+    pcaps = glob.glob(os.path.join(folder, f"*ps_fed_opt0*.{ext}"))
     logs  = glob.glob(os.path.join(folder, "*ps_fed_opt0*.log"))
 
     # index logs by *base* stem
@@ -86,7 +149,7 @@ def analyze_federated_learning_data(folder: str) -> Dict[str, Dict]:
             continue
 
         n_rounds, n_msgs = _round_stats(log)
-        dict_flow_B = get_flow_stats(pcap)
+        dict_flow_B = get_flow_stats_nfstream(pcap) if USE_NFSTREAM else get_flow_stats(pcap)
 
         results[os.path.basename(pcap)] = {
             "rounds_completed": n_rounds,
@@ -178,9 +241,7 @@ df_list_sync = [
 ]
 
 
-results_by_folder: Dict[str, Dict] = {}
-
-for entry in df_list_sync:
+def _process_entry(entry: Dict) -> Dict:
     full_path = os.path.join(base_path, entry["file_path"])
     entry["full_path"] = full_path
 
@@ -192,12 +253,28 @@ for entry in df_list_sync:
     entry["bytes_total"] = sum(
         v["dict_flow_B"]["bytes"].sum() for v in flows_dict.values()
     )
+    return entry
+
+
+def _run_batch():
+    global df_list_sync
+
+    if not df_list_sync:
+        print("[info] Nessuna cartella da analizzare.")
+        return
+
+    # le cartelle sono indipendenti: analizzale in parallelo, una per processo
+    workers = min(len(df_list_sync), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        df_list_sync = list(executor.map(_process_entry, df_list_sync))
+
+    # ---------------------------------------------------------------------------
+    pkl_path = Path(base_path) / "sync_analysis.pkl"
+    with open(pkl_path, "wb") as fout:
+        pickle.dump(df_list_sync, fout)
+
+    print(f"[info] Analisi completata. Risultati salvati in: {pkl_path}")
 
-    results_by_folder[entry["file_path"]] = entry
-    
-# ---------------------------------------------------------------------------
-pkl_path = Path(base_path) / "sync_analysis.pkl"
-with open(pkl_path, "wb") as fout:
-    pickle.dump(df_list_sync, fout)
 
-print(f"[info] Analisi completata. Risultati salvati in: {pkl_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    _run_batch()
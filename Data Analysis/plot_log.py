@@ -26,6 +26,7 @@ zoom_mode       = "end"      # 'start' • 'end' • ''   (ignored if ENABLE_ZOO
 SEPARATE_PLOTS  = True      # True → one PNG per run
 ENABLE_ZOOM     = False       # build the inset zoom?
 USE_TIME        = True      # X-axis = seconds elapsed
+LOG_BUFFER_SIZE = 1 << 20   # read buffer for .log files (fewer read syscalls)
 
 ###############################################################################
 # ---------------------------  HELPER FUNCTIONS  ---------------------------  #
@@ -74,25 +75,68 @@ def ensure_dir(path: str):
     return path
 
 
+def _log_key(log_path: str, use_time: bool) -> str:
+    return f"{os.path.getmtime(log_path)}-{os.path.getsize(log_path)}-{use_time}"
+
+
+def load_cached_rows(cache_path: str, key: str):
+    """Return (cfg, rows) cached for `key`, or None if missing/stale."""
+    try:
+        import pyarrow.parquet as pq
+        if not os.path.isfile(cache_path):
+            return None
+        meta = pq.read_schema(cache_path).metadata or {}
+        if meta.get(b'log_key', b'').decode() != key:
+            return None
+        cfg = ast.literal_eval(meta[b'cfg'].decode())
+        df = pq.read_table(cache_path).to_pandas()
+        # per-column tolist() keeps integer rounds as int (.values would upcast to float)
+        return cfg, list(zip(df['x'].tolist(), df['accuracy'].tolist()))
+    except Exception:
+        return None
+
+
+def save_cached_rows(cache_path: str, key: str, cfg, rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(pd.DataFrame(rows, columns=['x', 'accuracy']), preserve_index=False)
+        table = table.replace_schema_metadata({'log_key': key, 'cfg': repr(cfg)})
+        pq.write_table(table, cache_path)
+    except Exception:
+        pass
+
+
 def process_log(log_path: str, use_time: bool, mmap: dict):
     """Return (label, csv_path, parent_dir)."""
-    with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-        txt = f.read()
-
-    cfg          = extract_config(txt)
-    pairs        = extract_accuracies(txt)
-    rows, t0     = [[0,0]], extract_t0(txt)
-        
-    for idx, (ts_s, acc_s) in enumerate(pairs):
-        x = (pd.to_datetime(ts_s, format='%Y-%m-%d %H:%M:%S,%f') - (t0 := t0 or
-             pd.to_datetime(ts_s, format='%Y-%m-%d %H:%M:%S,%f'))).total_seconds() \
-            if use_time else idx
-        rows.append((x, float(acc_s)))
-
     parent_dir   = os.path.basename(os.path.dirname(log_path))
     out_dir      = ensure_dir(os.path.join(results_root, parent_dir))
     base         = os.path.splitext(os.path.basename(log_path))[0]
     csv_path     = os.path.join(out_dir, f"{base}.csv")
+
+    # parsed rows are cached next to the CSV, keyed on the log's mtime/size
+    cache_path   = os.path.join(out_dir, f"{base}.parquet")
+    key          = _log_key(log_path, use_time)
+    cached       = load_cached_rows(cache_path, key)
+
+    if cached is not None:
+        cfg, rows = cached
+    else:
+        with open(log_path, 'rb', buffering=LOG_BUFFER_SIZE) as f:
+            txt = f.read().decode('utf-8', 'ignore')
+
+        cfg          = extract_config(txt)
+        pairs        = extract_accuracies(txt)
+        rows, t0     = [[0,0]], extract_t0(txt)
+
+        for idx, (ts_s, acc_s) in enumerate(pairs):
+            x = (pd.to_datetime(ts_s, format='%Y-%m-%d %H:%M:%S,%f') - (t0 := t0 or
+                 pd.to_datetime(ts_s, format='%Y-%m-%d %H:%M:%S,%f'))).total_seconds() \
+                if use_time else idx
+            rows.append((x, float(acc_s)))
+
+        save_cached_rows(cache_path, key, cfg, rows)
+
     with open(csv_path, 'w', newline='') as c:
         csv.writer(c).writerows([[('time_sec' if use_time else 'round'), 'accuracy']] + rows)
 
@@ -5,35 +5,175 @@ Supports flexible role-based command configuration.
 """
 
 import os
+import pathlib
+import re
+import shlex
+import sys
 import time
 import datetime
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
-from string import Template
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Set, Tuple
+from string import Formatter, Template
 from mininet.log import info, error
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .containernet_manager import ContainernetManager, ContainerConfig
 
+# ANSI colors for terminal output
+_CYAN = '\033[96m'
+_GREEN = '\033[92m'
+_YELLOW = '\033[93m'
+_RED = '\033[91m'
+_MAGENTA = '\033[95m'
+_RESET = '\033[0m'
+_BOLD = '\033[1m'
+_DIM = '\033[2m'
+
+# References to another role's IP in a template: {server_ip}, $server_ip, ${server_ip}
+_ROLE_REF_RE = re.compile(r'\{(\w+)_ip\}|\$\{?(\w+)_ip\b')
+
+# References to a single container's IP: {ip_N}, {cN_ip} and their $-forms
+_CONTAINER_REF_RE = re.compile(r'\{(?:ip_(\d+)|c(\d+)_ip)\}|\$\{?(?:ip_(\d+)|c(\d+)_ip)\b')
+
+# Legacy aliases that point at the server role
+_SERVER_ALIAS_RE = re.compile(r'\{(?:ip|server_address)\}|\$\{?(?:ip|server_address)\b')
+
+# Common error indicators in command output
+_ERROR_RE = re.compile(
+    r'error|failed|exception|traceback|no such file|command not found|permission denied|cannot|fatal',
+    re.IGNORECASE
+)
 
-@dataclass
+# Per-instance __slots__ for the config dataclasses (dataclass slots need Python 3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Subshell wrapper around a role's main command: (main command, log path)
+_OUTPUT_WRAPPER = (
+    "( echo '=== Started: '$(date)' ===' ; %s ; EXIT_CODE=$? ; "
+    "echo '=== Finished: '$(date)' - Exit code: '$EXIT_CODE' ===' ; exit $EXIT_CODE ) > %s 2>&1"
+)
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _format_cached(template: str, items: Tuple[Tuple[str, type, Any], ...]) -> str:
+    """
+    Format `template` with the (name, type, value) triples it references.
+    The type is part of the key so that equal values of different types
+    (1, 1.0, True) do not share a cache entry.
+    """
+    return template.format_map({name: value for name, _, value in items})
+
+
+def _parse_format(template: str) -> Optional[List[Tuple[str, Optional[str], Optional[str], Optional[str]]]]:
+    """Parsed format-string pieces of `template`, or None if it is not a valid format string."""
+    try:
+        return list(Formatter().parse(template))
+    except ValueError:
+        return None
+
+
+def _referenced_fields(parsed) -> Optional[Tuple[str, ...]]:
+    """
+    Names of the variables a parsed format-style template references, or None
+    when the rendered result cannot be keyed on them (invalid format string,
+    nested fields in a format spec).
+    """
+    if parsed is None:
+        return None
+    names = set()
+    for _, field_name, format_spec, _ in parsed:
+        if field_name is None:
+            continue
+        if format_spec and '{' in format_spec:
+            return None
+        # {a.b} / {a[0]} only depend on variable 'a'
+        names.add(field_name.split('.', 1)[0].split('[', 1)[0])
+    return tuple(sorted(names))
+
+
+def _simple_parts(parsed) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """
+    (literal, variable name) pairs when every field of a parsed template is a
+    plain {name} with no conversion or format spec, otherwise None.
+    """
+    if parsed is None:
+        return None
+    parts = []
+    for literal, field_name, format_spec, conversion in parsed:
+        if field_name is not None and (not field_name.isidentifier() or format_spec or conversion):
+            return None
+        parts.append((literal, field_name))
+    return tuple(parts)
+
+
+@dataclass(**_SLOTS)
 class CommandTemplate:
     """Template for a command with variable substitution."""
     template: str
     description: str = ""
+    _fields: Optional[Tuple[str, ...]] = field(default=None, init=False, repr=False, compare=False)
+    _parts: Optional[Tuple[Tuple[str, Optional[str]], ...]] = field(default=None, init=False, repr=False, compare=False)
+    _dollar_template: Optional[Template] = field(default=None, init=False, repr=False, compare=False)
+    _dollar_only: bool = field(default=False, init=False, repr=False, compare=False)
+    _is_literal: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # No placeholders of either style: renders to itself
+        self._is_literal = not any(c in self.template for c in '{}$')
+        parsed = _parse_format(self.template)
+        # Not a valid format string: can only ever render as a $var template
+        self._dollar_only = parsed is None
+        self._fields = _referenced_fields(parsed)
+        self._parts = _simple_parts(parsed)
+        self._dollar_template = Template(self.template)
+    
+    def _fast_render(self, variables: Dict[str, Any]) -> str:
+        """Render a template made only of literals and plain {name} fields."""
+        out = []
+        for literal, name in self._parts:
+            out.append(literal)
+            if name is not None:
+                out.append(str(variables[name]))
+        return ''.join(out)
     
     def render(self, variables: Dict[str, Any]) -> str:
         """Render the command template with given variables."""
+        if self._is_literal:
+            return self.template
         # Support both {var} and $var style templates
+        if self._dollar_only:
+            return self._dollar_template.safe_substitute(variables)
         try:
-            # First try Python format style
-            return self.template.format(**variables)
+            # First try Python format style: precompiled for plain {name} fields,
+            # otherwise memoized on the referenced values
+            if self._parts is not None:
+                return self._fast_render(variables)
+            if self._fields is not None:
+                try:
+                    return _format_cached(self.template, tuple((name, type(variables[name]), variables[name]) for name in self._fields))
+                except TypeError:
+                    pass  # unhashable variable value, render without the cache
+            return self.template.format_map(variables)
         except (KeyError, ValueError):
             # Fall back to Template style
-            return Template(self.template).safe_substitute(variables)
+            return self._dollar_template.safe_substitute(variables)
+
 
+@lru_cache(maxsize=512)
+def _template(template: str) -> CommandTemplate:
+    """Shared CommandTemplate for a pre/post command string."""
+    return CommandTemplate(template)
 
-@dataclass
+
+@dataclass(**_SLOTS)
 class RoleConfig:
     """Configuration for a container role."""
     name: str
@@ -48,9 +188,10 @@ class RoleConfig:
     volumes: List[str] = field(default_factory=list)  # Additional volume mounts for this role
     docker_args: Dict[str, Any] = field(default_factory=dict)  # Custom Docker args for this role
     working_dir: Optional[str] = None  # Working directory inside container
+    depends_on: List[str] = field(default_factory=list)  # Roles that must start before this one
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ApplicationConfig:
     """Configuration for an application to run in containers."""
     name: str
@@ -72,14 +213,51 @@ class ApplicationConfig:
     verbose: bool = False          # Print commands to terminal
     show_output: bool = False      # Print command output to terminal
     debug: bool = False            # Enable debug mode (very verbose)
+    
+    # Execution options
+    parallel_launch: bool = True   # Launch the containers of a role concurrently
+
+
+def _join_commands(commands: List[str]) -> str:
+    """Join shell commands into a single line, keeping `cmd &` background jobs valid."""
+    parts = []
+    for cmd in commands:
+        cmd = cmd.strip().rstrip(';').rstrip()
+        parts.append(cmd)
+        parts.append(' ' if cmd.endswith('&') and not cmd.endswith('&&') else ' ; ')
+    return ''.join(parts[:-1])
+
+
+def _json_line(obj: Any) -> bytes:
+    """Compact one-line JSON encoding of `obj`, newline terminated."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, separators=(',', ':')) + '\n').encode()
+
+
+def _json_pretty(obj: Any) -> bytes:
+    """Indented JSON encoding of `obj`."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode()
 
 
 class CommandLogger:
-    """Logs all executed commands with timestamps."""
+    """
+    Logs all executed commands with timestamps, one JSON object per line.
+    The log file is truncated when the logger is created, so each run
+    writes its own log even when runs share an output directory.
+    """
+    
+    __slots__ = ('output_dir', '_out', 'filepath', '_fh', '_lock')
     
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, filename: str = "commands_executed.jsonl"):
         self.output_dir = output_dir
-        self.commands: List[Dict] = []
+        self._out = pathlib.Path(output_dir)
+        self.filepath = self._out / filename
+        # Entries are streamed to disk as they are logged (crash-safe, bounded memory)
+        self._fh = open(self.filepath, 'wb', buffering=1 << 16)
+        self._lock = threading.Lock()
     
     def log(self, container_name: str, command: str, role: str = "") -> None:
         """Log a command execution."""
@@ -89,15 +267,34 @@ class CommandLogger:
             'role': role,
             'command': command
         }
-        self.commands.append(entry)
-        info(f"*** [{container_name}] {command[:80]}{'...' if len(command) > 80 else ''}\n")
+        line = _json_line(entry)
+        with self._lock:
+            self._fh.write(line)
+        prefix = command if len(command) <= 80 else command[:80] + '...'
+        info(f"*** [{container_name}] {prefix}\n")
+    
+    def save(self, filename: Optional[str] = None) -> None:
+        """
+        Flush the command log to disk. With `filename`, the log is moved to
+        that file in the output directory and later entries go there too.
+        """
+        with self._lock:
+            self._fh.flush()
+            if filename is not None and self._out / filename != self.filepath:
+                self._fh.close()
+                target = self._out / filename
+                os.replace(self.filepath, target)
+                self.filepath = target
+                self._fh = open(target, 'ab', buffering=1 << 16)
+        info(f"*** Command log saved to {self.filepath}\n")
+    
+    def close(self) -> None:
+        """Flush and close the command log."""
+        if not self._fh.closed:
+            self._fh.close()
     
-    def save(self, filename: str = "commands_executed.json") -> None:
-        """Save command log to file."""
-        filepath = os.path.join(self.output_dir, filename)
-        with open(filepath, 'w') as f:
-            json.dump(self.commands, f, indent=2)
-        info(f"*** Command log saved to {filepath}\n")
+    def __del__(self):
+        self.close()
 
 
 class ApplicationRunner:
@@ -110,10 +307,79 @@ class ApplicationRunner:
         self.network = network_manager
         self.config = config
         self.logger = CommandLogger(config.output_dir)
+        self._out = pathlib.Path(config.output_dir)
         self._running_containers: Dict[int, Any] = {}
+        self._role_base_cache: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}
+        self._run_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._ip_table: Dict[int, str] = {}
+        self._ip_vars: Dict[str, str] = {}
+        self._ip_table_key: Optional[Tuple] = None
+        self._profile_str_cache: Dict[Tuple[Optional[str], Optional[str]], str] = {}
+        self._waves: Optional[List[List[str]]] = None
     
-    def _build_variables(self, container: ContainerConfig, role: RoleConfig) -> Dict[str, Any]:
+    def _get_ip_vars(self) -> Dict[str, str]:
+        """
+        {ip_N}/{cN_ip} variables for every container, rebuilt only when the
+        container ids or IPs change.
+        """
+        net = self.network
+        key = (tuple(net.ids), tuple(net.ips))
+        if key != self._ip_table_key:
+            self._ip_table = dict(zip(net.ids, net.ips))
+            ip_vars = dict(zip(net.ip_var_names, net.ips))
+            ip_vars.update(zip(net.alt_ip_var_names, net.ips))  # Alternative syntax
+            self._ip_vars = ip_vars
+            self._ip_table_key = key
+        return self._ip_vars
+    
+    def _build_role_base_variables(self, role: RoleConfig) -> Dict[str, Any]:
+        """
+        Build the container-independent variables of a role (role name,
+        container/role IPs, legacy aliases). Cached per role, keyed on the
+        container IP table and the first container of every role.
+        """
+        ip_vars = self._get_ip_vars()
+        key = (id(role), self._ip_table_key,
+               tuple((name, cfg.container_ids[0] if cfg.container_ids else None)
+                     for name, cfg in self.config.roles.items()))
+        cached = self._role_base_cache.get(role.name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        # Add role-specific variables
+        variables = {'role': role.name}
+        
+        # Add IPs for ALL containers by index: {ip_0}, {ip_1}, {ip_2}, ...
+        # This allows referencing any container's IP directly
+        variables.update(ip_vars)
+        ip_table = self._ip_table
+        
+        # Add IPs for all defined roles: {server_ip}, {broker_ip}, {coordinator_ip}, ...
+        # These reference the FIRST container in each role
+        for role_name, role_cfg in self.config.roles.items():
+            if role_cfg.container_ids:
+                role_ip = ip_table.get(role_cfg.container_ids[0])
+                if role_ip is not None:
+                    variables[f'{role_name}_ip'] = role_ip
+        
+        # Legacy aliases for backward compatibility
+        if 'server' in self.config.roles:
+            server_role = self.config.roles['server']
+            if server_role.container_ids:
+                server_ip = ip_table.get(server_role.container_ids[0])
+                if server_ip is not None:
+                    variables['server_address'] = server_ip
+                    variables['ip'] = server_ip  # Legacy alias
+        
+        self._role_base_cache[role.name] = (key, variables)
+        return variables
+    
+    def _build_variables(self, container: ContainerConfig, role: RoleConfig,
+                         base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Build variable dictionary for command template rendering."""
+        if base is None:
+            base = self._build_role_base_variables(role)
+        
         # Start with global variables
         variables = dict(self.config.global_variables)
         
@@ -127,50 +393,29 @@ class ApplicationRunner:
             'device_profile': container.device_profile_name or 'none',
             'network_profile': container.network_profile_name or 'none',
             'output_dir': '/app/saved_output',
-            'timestamp': datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
+            'timestamp': self._run_timestamp,
             'index': container.id,  # Alias for container_id
             'my_ip': container.ip_address,  # Alias for container_ip
         })
         
-        # Add role-specific variables
-        variables['role'] = role.name
-        
-        # Add IPs for ALL containers by index: {ip_0}, {ip_1}, {ip_2}, ...
-        # This allows referencing any container's IP directly
-        for cid, cfg in self.network.containers.items():
-            variables[f'ip_{cid}'] = cfg.ip_address
-            variables[f'c{cid}_ip'] = cfg.ip_address  # Alternative syntax
-        
-        # Add IPs for all defined roles: {server_ip}, {broker_ip}, {coordinator_ip}, ...
-        # These reference the FIRST container in each role
-        for role_name, role_cfg in self.config.roles.items():
-            if role_cfg.container_ids:
-                first_container_id = role_cfg.container_ids[0]
-                role_container = self.network.get_container(first_container_id)
-                if role_container:
-                    variables[f'{role_name}_ip'] = role_container.ip_address
-        
-        # Legacy aliases for backward compatibility
-        if 'server' in self.config.roles:
-            server_role = self.config.roles['server']
-            if server_role.container_ids:
-                server_id = server_role.container_ids[0]
-                server_container = self.network.get_container(server_id)
-                if server_container:
-                    variables['server_address'] = server_container.ip_address
-                    variables['ip'] = server_container.ip_address  # Legacy alias
+        # Role and IP variables shared by every container of the role
+        variables.update(base)
         
         return variables
     
     def _get_log_filename(self, container: ContainerConfig, role: RoleConfig) -> str:
         """Generate log filename for a container."""
-        dev_str = (container.device_profile_name or 'default').replace(" ", "_")[:15]
-        net_str = (container.network_profile_name or 'default').replace(" ", "_")[:15]
-        profile_str = f"dev_{dev_str}_net_{net_str}"
+        key = (container.device_profile_name, container.network_profile_name)
+        profile_str = self._profile_str_cache.get(key)
+        if profile_str is None:
+            dev_str = (key[0] or 'default').replace(" ", "_")[:15]
+            net_str = (key[1] or 'default').replace(" ", "_")[:15]
+            profile_str = self._profile_str_cache[key] = f"dev_{dev_str}_net_{net_str}"
         return f"{self.config.name}_{role.name}_{container.name}_{profile_str}.log"
     
     def run_command(self, container: ContainerConfig, command: str, 
-                    role: Optional[RoleConfig] = None, async_exec: bool = False) -> Optional[str]:
+                    role: Optional[RoleConfig] = None, async_exec: bool = False,
+                    log: bool = True) -> Optional[str]:
         """
         Run a command in a container using /bin/bash.
         
@@ -179,108 +424,100 @@ class ApplicationRunner:
             command: Command to execute
             role: Role configuration
             async_exec: If True, run command asynchronously
+            log: If False, skip the command log (caller already logged it)
         """
+        cfg = self.config
+        verbose = cfg.verbose or cfg.debug
         docker = container.docker_container
         role_name = role.name if role else "unknown"
         
-        if self.config.log_commands:
+        if log and cfg.log_commands:
             self.logger.log(container.name, command, role_name)
         
-        # ANSI colors for terminal output
-        CYAN = '\033[96m'
-        GREEN = '\033[92m'
-        YELLOW = '\033[93m'
-        RED = '\033[91m'
-        RESET = '\033[0m'
-        BOLD = '\033[1m'
-        DIM = '\033[2m'
-        
         # Verbose output - show command being executed
-        if self.config.verbose or self.config.debug:
+        if verbose:
             # Truncate command for display if too long
-            display_cmd = command[:300] + "..." if len(command) > 300 else command
+            display_cmd = command
+            if len(command) > 300:
+                display_cmd = command[:300] + "..."
             display_cmd = display_cmd.replace('\n', ' ').strip()
             
-            print(f"{CYAN}[{container.name}:{role_name}]{RESET} {BOLD}CMD:{RESET} {display_cmd}")
+            print(f"{_CYAN}[{container.name}:{role_name}]{_RESET} {_BOLD}CMD:{_RESET} {display_cmd}")
         
         if async_exec:
             docker.sendCmd(command)
-            if self.config.verbose or self.config.debug:
-                print(f"{YELLOW}  → Running async (output will be in log file){RESET}")
+            if verbose:
+                print(f"{_YELLOW}  → Running async (output will be in log file){_RESET}")
             return None
         else:
             result = docker.cmd(command)
             
-            # Show output if requested
-            if self.config.show_output or self.config.debug:
-                if result and result.strip():
-                    # Check for common error indicators
-                    result_lower = result.lower()
-                    has_error = any(err in result_lower for err in 
-                                   ['error', 'failed', 'exception', 'traceback', 'no such file', 
-                                    'command not found', 'permission denied', 'cannot', 'fatal'])
-                    
-                    if has_error:
-                        print(f"{RED}  ✗ OUTPUT (possible error):{RESET}")
-                        for line in result.strip().split('\n'):
-                            print(f"{RED}    {line}{RESET}")
-                    else:
-                        lines = result.strip().split('\n')
-                        if self.config.debug:
-                            # In debug mode, show all output
-                            print(f"{GREEN}  ✓ OUTPUT ({len(lines)} lines):{RESET}")
-                            for line in lines:
-                                print(f"{DIM}    {line}{RESET}")
-                        elif len(lines) > 10:
-                            # Truncate long output
-                            print(f"{GREEN}  ✓ OUTPUT ({len(lines)} lines, showing first/last 5):{RESET}")
-                            for line in lines[:5]:
-                                print(f"    {line}")
-                            print(f"    {DIM}... ({len(lines) - 10} lines hidden) ...{RESET}")
-                            for line in lines[-5:]:
-                                print(f"    {line}")
-                        else:
-                            print(f"{GREEN}  ✓ OUTPUT:{RESET}")
-                            for line in lines:
-                                print(f"    {line}")
-                else:
-                    if self.config.debug:
-                        print(f"{GREEN}  ✓ (no output){RESET}")
-            elif self.config.verbose:
+            # Show output if requested; the error scan runs only when something is displayed
+            if cfg.show_output or cfg.debug:
+                self._print_output(result)
+            elif verbose:
                 # In verbose mode (not show_output), just indicate success/failure
-                if result:
-                    result_lower = result.lower()
-                    has_error = any(err in result_lower for err in 
-                                   ['error', 'failed', 'exception', 'traceback', 'no such file', 
-                                    'command not found', 'permission denied', 'cannot', 'fatal'])
-                    if has_error:
-                        print(f"{RED}  ✗ Command may have failed - use --show-output to see details{RESET}")
-                        # Show first few lines of error
-                        for line in result.strip().split('\n')[:3]:
-                            print(f"{RED}    {line}{RESET}")
-                    else:
-                        print(f"{GREEN}  ✓ OK{RESET}")
-                else:
-                    print(f"{GREEN}  ✓ OK{RESET}")
+                self._print_output(result, summary_only=True)
             
             return result
     
-    def setup_tcpdump(self, container: ContainerConfig, role: RoleConfig) -> None:
-        """Set up tcpdump on a container if enabled."""
-        if not self.config.enable_tcpdump:
+    def _print_output(self, result: Optional[str], summary_only: bool = False) -> None:
+        """Print command output, or only an OK/failed summary if `summary_only`."""
+        if not result or not result.strip():
+            if summary_only:
+                print(f"{_GREEN}  ✓ OK{_RESET}")
+            elif self.config.debug:
+                print(f"{_GREEN}  ✓ (no output){_RESET}")
             return
         
-        # Disable network offloading for accurate capture
-        offload_cmd = "ethtool -K eth0 gro off tx off rx off lro off gso off tso off sg off rxvlan off txvlan off rxhash off ufo off 2>/dev/null || true"
-        self.run_command(container, offload_cmd, role)
+        # Check for common error indicators
+        has_error = _ERROR_RE.search(result) is not None
+        lines = result.strip().split('\n')
         
-        intf_offload_cmd = f"ethtool -K {container.name}-eth0 gro off tx off rx off lro off gso off tso off sg off rxvlan off txvlan off rxhash off ufo off 2>/dev/null || true"
-        self.run_command(container, intf_offload_cmd, role)
+        # Build the whole block and write it at once (one stdout call per command)
+        if summary_only:
+            if has_error:
+                out = [f"{_RED}  ✗ Command may have failed - use --show-output to see details{_RESET}\n"]
+                # Show first few lines of error
+                out.extend(f"{_RED}    {line}{_RESET}\n" for line in lines[:3])
+            else:
+                out = [f"{_GREEN}  ✓ OK{_RESET}\n"]
+        elif has_error:
+            out = [f"{_RED}  ✗ OUTPUT (possible error):{_RESET}\n"]
+            out.extend(f"{_RED}    {line}{_RESET}\n" for line in lines)
+        elif self.config.debug:
+            # In debug mode, show all output
+            out = [f"{_GREEN}  ✓ OUTPUT ({len(lines)} lines):{_RESET}\n"]
+            out.extend(f"{_DIM}    {line}{_RESET}\n" for line in lines)
+        elif len(lines) > 10:
+            # Truncate long output
+            out = [f"{_GREEN}  ✓ OUTPUT ({len(lines)} lines, showing first/last 5):{_RESET}\n"]
+            out.extend(f"    {line}\n" for line in lines[:5])
+            out.append(f"    {_DIM}... ({len(lines) - 10} lines hidden) ...{_RESET}\n")
+            out.extend(f"    {line}\n" for line in lines[-5:])
+        else:
+            out = [f"{_GREEN}  ✓ OUTPUT:{_RESET}\n"]
+            out.extend(f"    {line}\n" for line in lines)
+        sys.stdout.write(''.join(out))
+    
+    def _tcpdump_commands(self, container: ContainerConfig) -> List[str]:
+        """Commands that set up tcpdump on a container (empty if disabled)."""
+        if not self.config.enable_tcpdump:
+            return []
         
-        # Start tcpdump
         pcap_file = f"/app/saved_output/{self.config.name}_{container.name}.pcap"
-        tcpdump_cmd = f"tcpdump -i {self.config.tcpdump_interfaces} -w {pcap_file} &"
-        self.run_command(container, tcpdump_cmd, role)
+        return [
+            # Disable network offloading for accurate capture
+            "ethtool -K eth0 gro off tx off rx off lro off gso off tso off sg off rxvlan off txvlan off rxhash off ufo off 2>/dev/null || true",
+            f"ethtool -K {container.name}-eth0 gro off tx off rx off lro off gso off tso off sg off rxvlan off txvlan off rxhash off ufo off 2>/dev/null || true",
+            # Start tcpdump
+            f"tcpdump -i {self.config.tcpdump_interfaces} -w {pcap_file} &",
+        ]
+    
+    def setup_tcpdump(self, container: ContainerConfig, role: RoleConfig) -> None:
+        """Set up tcpdump on a container if enabled."""
+        for cmd in self._tcpdump_commands(container):
+            self.run_command(container, cmd, role)
     
     def run_role(self, role_name: str) -> None:
         """Execute commands for all containers in a role."""
@@ -293,73 +530,183 @@ class ApplicationRunner:
         
         # Verbose: show role details
         if self.config.verbose:
-            MAGENTA = '\033[95m'
-            BOLD = '\033[1m'
-            RESET = '\033[0m'
-            print(f"\n{MAGENTA}{'='*60}{RESET}")
-            print(f"{MAGENTA}{BOLD}ROLE: {role_name}{RESET}")
-            print(f"{MAGENTA}Containers: {role.container_ids}{RESET}")
-            print(f"{MAGENTA}Wait for completion: {role.wait_for_completion}{RESET}")
-            print(f"{MAGENTA}Pre-commands: {len(role.pre_commands)}{RESET}")
-            print(f"{MAGENTA}{'='*60}{RESET}\n")
+            print(f"\n{_MAGENTA}{'='*60}{_RESET}")
+            print(f"{_MAGENTA}{_BOLD}ROLE: {role_name}{_RESET}")
+            print(f"{_MAGENTA}Containers: {role.container_ids}{_RESET}")
+            print(f"{_MAGENTA}Wait for completion: {role.wait_for_completion}{_RESET}")
+            print(f"{_MAGENTA}Pre-commands: {len(role.pre_commands)}{_RESET}")
+            print(f"{_MAGENTA}{'='*60}{_RESET}\n")
         
         # Apply startup delay
         if role.startup_delay > 0:
             info(f"*** Waiting {role.startup_delay}s before starting {role_name}\n")
             time.sleep(role.startup_delay)
         
-        for container_id in role.container_ids:
-            container = self.network.get_container(container_id)
-            if not container:
-                error(f"Container {container_id} not found\n")
-                continue
-            
-            # Verbose: show container info
-            if self.config.verbose:
-                CYAN = '\033[96m'
-                RESET = '\033[0m'
-                print(f"\n{CYAN}--- Container {container.name} (ID: {container_id}, IP: {container.ip_address}) ---{RESET}")
-            
-            # Build variables for this container
-            variables = self._build_variables(container, role)
-            
-            # Set up tcpdump if enabled
-            self.setup_tcpdump(container, role)
-            
-            # Ensure output directory is writable inside container
-            self.run_command(container, "chmod 777 /app/saved_output 2>/dev/null || true", role)
-            
-            # Run pre-commands
-            for pre_cmd in role.pre_commands:
-                cmd = CommandTemplate(pre_cmd).render(variables)
-                self.run_command(container, cmd, role)
-            
-            # Build main command with robust output capture
-            # Wrap in subshell to ensure ALL output is captured, including early failures
-            main_cmd = role.command.render(variables)
-            log_file = self._get_log_filename(container, role)
-            log_path = f"/app/saved_output/{log_file}"
-            
-            # The subshell ensures:
-            # 1. Log file is created with timestamp even if command fails immediately
-            # 2. All stdout/stderr is captured (including bash errors)
-            # 3. Exit code is logged at the end
-            full_cmd = f"( echo '=== Started: '$(date)' ===' ; {main_cmd} ; EXIT_CODE=$? ; echo '=== Finished: '$(date)' - Exit code: '$EXIT_CODE' ===' ; exit $EXIT_CODE ) > {log_path} 2>&1"
-            
-            # Execute command
-            if role.wait_for_completion:
-                self.run_command(container, full_cmd, role, async_exec=True)
-                self._running_containers[container_id] = container
-            else:
-                # Background execution
-                self.run_command(container, f"{full_cmd} &", role)
+        # Roles whose commands are all literal never need template variables
+        literal = role.command._is_literal and all(_template(cmd)._is_literal for cmd in role.pre_commands)
+        base_variables = None if literal else self._build_role_base_variables(role)
+        
+        if not self.config.parallel_launch or len(role.container_ids) <= 1:
+            for container_id in role.container_ids:
+                self._run_container_in_role(container_id, role, base_variables)
+            return
+        
+        # Containers are independent: launch them concurrently, but finish the
+        # whole role before returning so role ordering is preserved
+        workers = min(len(role.container_ids), (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._run_container_in_role, container_id, role, base_variables)
+                       for container_id in role.container_ids]
+            for future in futures:
+                future.result()
+    
+    def _run_container_in_role(self, container_id: int, role: RoleConfig,
+                               base_variables: Optional[Dict[str, Any]]) -> None:
+        """
+        Set up and launch a role's command in one container. `base_variables`
+        is None when none of the role's commands use template variables.
+        """
+        container = self.network.get_container(container_id)
+        if not container:
+            error(f"Container {container_id} not found\n")
+            return
+        
+        # Verbose: show container info
+        if self.config.verbose:
+            print(f"\n{_CYAN}--- Container {container.name} (ID: {container_id}, IP: {container.ip_address}) ---{_RESET}")
+        
+        # Build variables for this container
+        variables = {} if base_variables is None else self._build_variables(container, role, base_variables)
+        
+        # Set up tcpdump if enabled
+        setup = self._tcpdump_commands(container)
+        
+        # Ensure output directory is writable inside container
+        setup.append("chmod 777 /app/saved_output 2>/dev/null || true")
+        
+        # Run pre-commands
+        pre_cmds = [_template(pre_cmd).render(variables) for pre_cmd in role.pre_commands]
+        
+        # Build main command with robust output capture
+        # Wrap in subshell to ensure ALL output is captured, including early failures
+        main_cmd = role.command.render(variables)
+        log_file = self._get_log_filename(container, role)
+        log_path = f"/app/saved_output/{log_file}"
+        
+        # The subshell ensures:
+        # 1. Log file is created with timestamp even if command fails immediately
+        # 2. All stdout/stderr is captured (including bash errors)
+        # 3. Exit code is logged at the end
+        full_cmd = _OUTPUT_WRAPPER % (main_cmd, log_path)
+        
+        if not role.wait_for_completion:
+            # Background execution
+            full_cmd += " &"
+        
+        # Log every step as written in the configuration
+        if self.config.log_commands:
+            for step in (*setup, *pre_cmds, full_cmd):
+                self.logger.log(container.name, step, role.name)
+        
+        # All setup steps run to completion in a single blocking round-trip
+        # before the main command is launched. Pre-commands go through eval
+        # so that a '#' comment or a dangling '&&' in one of them only
+        # affects that command, not the steps joined after it.
+        setup.extend(f"eval {shlex.quote(cmd)}" for cmd in pre_cmds)
+        self.run_command(container, _join_commands(setup), role, log=False)
+        
+        # Execute command
+        if role.wait_for_completion:
+            self.run_command(container, full_cmd, role, async_exec=True, log=False)
+            self._running_containers[container_id] = container
+        else:
+            self.run_command(container, full_cmd, role, log=False)
+    
+    def _role_dependencies(self) -> Dict[str, Set[str]]:
+        """
+        Map each role to the roles it depends on: explicit `depends_on` plus
+        roles whose IP its commands reference ({broker_ip}, legacy {ip}, ...)
+        and roles owning a container referenced by {ip_N} / {cN_ip}.
+        """
+        roles = self.config.roles
+        owner = {}
+        for name, role in roles.items():
+            for cid in role.container_ids:
+                owner.setdefault(cid, name)
+        deps: Dict[str, Set[str]] = {}
+        for name, role in roles.items():
+            refs = set(role.depends_on)
+            for template in [role.command.template, *role.pre_commands, *role.post_commands]:
+                for m in _ROLE_REF_RE.finditer(template):
+                    refs.add(m.group(1) or m.group(2))
+                for m in _CONTAINER_REF_RE.finditer(template):
+                    cid = int(next(g for g in m.groups() if g is not None))
+                    if cid in owner:
+                        refs.add(owner[cid])
+                if _SERVER_ALIAS_RE.search(template):
+                    refs.add('server')
+            deps[name] = {r for r in refs if r in roles and r != name}
+        return deps
+    
+    def _role_waves(self) -> List[List[str]]:
+        """
+        Group roles into waves with Kahn's algorithm: every role in a wave has
+        all its dependencies in earlier waves. Within a wave, roles with the
+        most (transitive) dependents come first.
+        """
+        deps = self._role_dependencies()
+        dependents: Dict[str, Set[str]] = {name: set() for name in deps}
+        for name, role_deps in deps.items():
+            for dep in role_deps:
+                dependents[dep].add(name)
+        
+        def descendants(name: str, seen: Set[str]) -> Set[str]:
+            for child in dependents[name]:
+                if child not in seen:
+                    seen.add(child)
+                    descendants(child, seen)
+            return seen
+        
+        position = {name: i for i, name in enumerate(deps)}
+        priority = {name: len(descendants(name, set())) for name in deps}
+        pending = {name: set(role_deps) for name, role_deps in deps.items()}
+        
+        waves = []
+        while pending:
+            ready = [name for name, role_deps in pending.items() if not role_deps]
+            if not ready:
+                # Dependency cycle: run the rest in definition order
+                error(f"Circular role dependencies among {sorted(pending)}, using definition order\n")
+                ready = list(pending)
+            ready.sort(key=lambda name: (-priority[name], position[name]))
+            waves.append(ready)
+            for name in ready:
+                del pending[name]
+            for role_deps in pending.values():
+                role_deps.difference_update(ready)
+        return waves
     
     def run_all_roles(self) -> None:
-        """Execute all roles in the configured order."""
-        order = self.config.role_order or list(self.config.roles.keys())
+        """
+        Execute all roles in the configured order. With `role_order: auto`,
+        roles run in dependency order and independent roles are started
+        concurrently.
+        """
+        if self.config.role_order:
+            for role_name in self.config.role_order:
+                self.run_role(role_name)
+            return
         
-        for role_name in order:
-            self.run_role(role_name)
+        if self._waves is None:
+            self._waves = self._role_waves()
+        for wave in self._waves:
+            if len(wave) == 1 or not self.config.parallel_launch:
+                for role_name in wave:
+                    self.run_role(role_name)
+                continue
+            with ThreadPoolExecutor(max_workers=len(wave)) as pool:
+                for future in [pool.submit(self.run_role, role_name) for role_name in wave]:
+                    future.result()
     
     def wait_for_completion(self) -> None:
         """Wait for all async commands to complete."""
@@ -384,12 +731,13 @@ class ApplicationRunner:
         
         # Save logs
         self.logger.save()
+        self.logger.close()
         
         info(f"*** Application {self.config.name} completed\n")
     
     def save_config(self, filename: str = "application_config.json") -> None:
         """Save the application configuration for reproducibility."""
-        filepath = os.path.join(self.config.output_dir, filename)
+        filepath = self._out / filename
         
         config_dict = {
             'name': self.config.name,
@@ -408,8 +756,7 @@ class ApplicationRunner:
                 'environment': role.environment
             }
         
-        with open(filepath, 'w') as f:
-            json.dump(config_dict, f, indent=2)
+        filepath.write_bytes(_json_pretty(config_dict))
         
         info(f"*** Application config saved to {filepath}\n")
 
@@ -468,7 +815,7 @@ def create_application_config_from_dict(
             
             # Handle special container_ids values
             if container_ids == "all_except_server":
-                server_ids = roles_config.get('server', {}).get('container_ids', [0])
+                server_ids = set(roles_config.get('server', {}).get('container_ids', [0]))
                 container_ids = [i for i in range(num_containers) if i not in server_ids]
             elif container_ids == "all":
                 container_ids = list(range(num_containers))
@@ -493,7 +840,8 @@ def create_application_config_from_dict(
                 image=role_data.get('image'),
                 volumes=role_data.get('volumes', []),
                 docker_args=docker_args,
-                working_dir=role_data.get('working_dir')
+                working_dir=role_data.get('working_dir'),
+                depends_on=role_data.get('depends_on', [])
             )
     else:
         # Legacy FL configuration - create default server/client roles
@@ -513,7 +861,7 @@ def create_application_config_from_dict(
             name='server',
             container_ids=[0],
             command=CommandTemplate(
-                template="python3 -u run.py --protocol {protocol} --mode Server --port {port} --ip {container_ip} --index {container_id} " + args,
+                template="python3 -u run.py --protocol {protocol} --mode Server --port {port} --ip {container_ip} --index {container_id} {extra_args}",
                 description="FL Parameter Server"
             ),
             startup_delay=0.0,
@@ -525,15 +873,17 @@ def create_application_config_from_dict(
             name='client',
             container_ids=list(range(1, num_containers)),
             command=CommandTemplate(
-                template="python3 -u run.py --protocol {protocol} --mode Client --my_ip {container_ip} --port {port} --ip {server_ip} --index {container_id} " + args,
+                template="python3 -u run.py --protocol {protocol} --mode Client --my_ip {container_ip} --port {port} --ip {server_ip} --index {container_id} {extra_args}",
                 description="FL Client"
             ),
             startup_delay=20.0,  # Wait for server to start
             wait_for_completion=True
         )
     
-    # Determine role order
+    # Determine role order ('auto': derived from role dependencies at run time)
     role_order = app_config.get('role_order', ['server', 'client'])
+    if role_order == 'auto':
+        role_order = []
     
     return ApplicationConfig(
         name=name,
@@ -542,6 +892,7 @@ def create_application_config_from_dict(
         global_variables=global_vars,
         role_order=role_order,
         enable_tcpdump=config_dict.get('enable_tcpdump', False),
+        parallel_launch=app_config.get('parallel_launch', True),
         verbose=verbose,
         show_output=show_output,
         debug=debug
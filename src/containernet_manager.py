@@ -4,20 +4,28 @@ Completely decoupled from application-specific logic.
 Uses existing resources.performance module for device/network profiles.
 """
 
-from mininet.net import Containernet
-from mininet.node import Controller, Node
-from mininet.link import TCLink
-from mininet.cli import CLI
-from mininet.log import info, error
-from mininet.node import OVSSwitch as _OVSSwitch
+from mininet.log import debug, info, error
 
 import ipaddress
-import itertools
 import os
-import datetime
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import from resources submodule (src/resources/)
 from .resources.performance import (
@@ -26,32 +34,220 @@ from .resources.performance import (
     ContainerResourceManager,
     CPUAllocator,
     load_profile_data,
-    perturb_device
+    perturb_device,
+    router_pair_links
 )
 
 # Import cleanup utility
 from .resources import clean_containernet
 
 
-class PatchedOVSSwitch(_OVSSwitch):
-    """OVS Switch with version fix for Mininet compatibility."""
-    OVSVersion = '2.5'
+# Per-instance __slots__ for the config dataclasses (dataclass slots need Python 3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@lru_cache(maxsize=256)
+def _abspath(path: str) -> str:
+    """os.path.abspath, memoized per host path (the working directory is fixed during a run)."""
+    return os.path.abspath(path)
+
+
+# String values that mean "no profile" in device_type/network_type settings
+_EMPTY_SENTINELS = frozenset({'none', 'nan', ''})
+
+
+def _is_empty(value: Any) -> bool:
+    """True for None and the 'none'/'nan'/'' placeholders (any case)."""
+    return value is None or (isinstance(value, str) and value.lower() in _EMPTY_SENTINELS)
+
+
+def _as_int(value: Any) -> int:
+    """Coerce a resource value to int, passing plain ints through (None -> 0)."""
+    return value if type(value) is int else int(value or 0)
+
+
+def _sectioned_script(sections: List[Tuple[str, str]]) -> str:
+    """
+    Join (name, command) pairs into a single shell line. Each command's output
+    is preceded by an '@@name' marker line so it can be split by _parse_sections.
+    """
+    return ' ; '.join(f"echo @@{name} ; {command}" for name, command in sections)
+
+
+def _parse_sections(output: str) -> Dict[str, str]:
+    """Split the output of a _sectioned_script into {name: stripped output}."""
+    sections: Dict[str, List[str]] = {}
+    current = None
+    for line in output.splitlines():
+        if line.startswith('@@'):
+            current = sections.setdefault(line[2:].strip(), [])
+        elif current is not None:
+            current.append(line)
+    return {name: '\n'.join(lines).strip() for name, lines in sections.items()}
+
+
+# 'ip route add' error messages, see _classify_route_result
+_EXIST_MARKERS = ('File exists', 'RTNETLINK answers: File exists')
+_UNREACH = 'Network is unreachable'
+
+
+def _classify_route_result(result: str) -> Optional[str]:
+    """
+    Classify the output of 'ip route add': None if it succeeded silently,
+    'exists' or 'unreachable' for the known errors, else the output itself.
+    """
+    if not result:
+        return None
+    if any(marker in result for marker in _EXIST_MARKERS):
+        return 'exists'
+    if _UNREACH in result:
+        return 'unreachable'
+    return result
+
+
+# Back-off (seconds) between interface state polls, about 2 s in total
+_IFACE_UP_BACKOFF = (0.02, 0.05, 0.1, 0.2, 0.4, 0.6, 0.63)
+
+
+def _wait_iface_up_script(intf_name: str) -> str:
+    """Shell loop that returns as soon as intf_name reports LOWER_UP."""
+    delays = ' '.join(map(str, _IFACE_UP_BACKOFF))
+    return (f"for d in {delays}; do "
+            f"ip link show {intf_name} 2>/dev/null | grep -q LOWER_UP && break ; sleep $d ; done")
+
+
+def _default_route_iface() -> Optional[str]:
+    """Interface of the host's IPv4 default route (read from /proc/net/route)."""
+    with open('/proc/net/route') as f:
+        next(f, None)  # Header: Iface Destination Gateway Flags ... Mask ...
+        for line in f:
+            fields = line.split()
+            # Default route: destination and mask both 0.0.0.0
+            if len(fields) > 7 and fields[1] == '00000000' and fields[7] == '00000000':
+                return fields[0]
+    return None
+
+
+def _iptables_ruleset(rules: Dict[str, List[str]], existing: set) -> str:
+    """
+    Build iptables-restore input appending rules ({table: [rule, ...]}, rules
+    without the '-A'). Rules already in the iptables-save lines 'existing' are
+    deleted first, so they move to the end of their chain instead of doubling.
+    """
+    lines = []
+    for table, table_rules in rules.items():
+        lines.append(f'*{table}')
+        lines.extend(f'-D {rule}' for rule in table_rules if f'-A {rule}' in existing)
+        lines.extend(f'-A {rule}' for rule in table_rules)
+        lines.append('COMMIT')
+    return '\n'.join(lines) + '\n'
+
+
+# (ip, name) pinged by debug_network to check internet access
+_INTERNET_TEST_TARGETS = (
+    ('8.8.8.8', 'Google DNS'),
+    ('1.1.1.1', 'Cloudflare DNS'),
+)
+
+
+def _ping_cmd(target: str, timeout: int) -> str:
+    """Single quiet, numeric (no reverse DNS) ping; its exit status tells if target is reachable."""
+    return f"ping -c 1 -W {timeout} -q -n {target} >/dev/null 2>&1"
+
+
+def _ping_all(node: Any, targets: List[str], timeout: int) -> set:
+    """
+    Ping all targets at once from a node's shell (single ping each) and return
+    the reachable ones. The jobs run in a subshell so 'wait' does not block on
+    other background processes of the node (e.g. tcpdump).
+    """
+    jobs = ' '.join(f"({_ping_cmd(t, timeout)} && echo @@ok {t}) &" for t in targets)
+    output = node.cmd(f"( {jobs} wait )")
+    return {line[5:].strip() for line in output.splitlines() if line.startswith('@@ok ')}
+
+
+def _json_pretty(obj: Any) -> bytes:
+    """Indented JSON encoding of `obj`; unknown types are written as str()."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str,
+                            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, default=str).encode()
+
+
+# Host tools run through subprocess, resolved once so each call skips the PATH search
+_ETHTOOL = shutil.which('ethtool') or '/usr/sbin/ethtool'
+_IPTABLES_SAVE = shutil.which('iptables-save') or '/usr/sbin/iptables-save'
+_IPTABLES_RESTORE = shutil.which('iptables-restore') or '/usr/sbin/iptables-restore'
+
 
+# Offload features turned off on every host interface (as resources/disable_offload.sh does)
+_OFFLOAD_FEATURES = ('gro', 'tx', 'rx', 'rxvlan', 'txvlan', 'sg', 'tso', 'gso', 'ufo', 'lro', 'rxhash')
 
-class LinuxRouter(Node):
-    """Linux-based router node with IP forwarding enabled."""
+
+def _disable_offload(intf_name: str) -> None:
+    """Turn off _OFFLOAD_FEATURES on one host interface with a single ethtool call."""
+    args = [_ETHTOOL, '-K', intf_name]
+    for feature in _OFFLOAD_FEATURES:
+        args += (feature, 'off')
+    try:
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        pass
+
+
+def _disable_host_offload() -> None:
+    """Disable network offloading on all host interfaces (switch ports included)."""
+    intf_names = os.listdir('/sys/class/net')
+    if intf_names:
+        with ThreadPoolExecutor(max_workers=min(16, len(intf_names))) as pool:
+            list(pool.map(_disable_offload, intf_names))
+
+
+def _ip_view(node: Any) -> Tuple[str, str]:
+    """(addresses, routes) of a Mininet node, as shown by the 'ip' command."""
+    out = _parse_sections(node.cmd(_sectioned_script([
+        ('addr', 'ip -o addr show'),
+        ('routes', 'ip route'),
+    ])))
+    return out['addr'], out['routes']
+
+
+# Mininet's net/node/link/cli modules pull in pexpect, OVS and the Docker client.
+# They are imported by _import_mininet() when the first ContainernetManager is
+# created, so the config dataclasses below stay cheap to import.
+Containernet = Controller = Docker = TCLink = CLI = None
+PatchedOVSSwitch = LinuxRouter = None
+
+
+def _import_mininet() -> None:
+    """Import the Mininet topology modules and define the node classes built on them."""
+    global Containernet, Controller, Docker, TCLink, CLI, PatchedOVSSwitch, LinuxRouter
+    if LinuxRouter is not None:
+        return
     
-    def config(self, **params):
-        super(LinuxRouter, self).config(**params)
-        self.cmd('sysctl net.ipv4.ip_forward=1')
-        self.cmd('ethtool -K', self, 'gro', 'off', 'tx', 'off', 'rx', 'off')
+    from mininet.net import Containernet
+    from mininet.node import Controller, Docker, Node, OVSSwitch
+    from mininet.link import TCLink
+    from mininet.cli import CLI
     
-    def terminate(self):
-        self.cmd('sysctl net.ipv4.ip_forward=0')
-        super(LinuxRouter, self).terminate()
+    class PatchedOVSSwitch(OVSSwitch):
+        """OVS Switch with version fix for Mininet compatibility."""
+        OVSVersion = '2.5'
+    
+    class LinuxRouter(Node):
+        """Linux-based router node with IP forwarding enabled."""
+        
+        def config(self, **params):
+            super(LinuxRouter, self).config(**params)
+            # Forwarding and offload settings in a single shell round-trip
+            self.cmd(f'sysctl net.ipv4.ip_forward=1 ; ethtool -K {self} gro off tx off rx off')
+        
+        def terminate(self):
+            self.cmd('sysctl net.ipv4.ip_forward=0')
+            super(LinuxRouter, self).terminate()
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ContainerConfig:
     """Configuration for a single container."""
     id: int
@@ -94,7 +290,7 @@ class ContainerConfig:
     docker_iface: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class NetworkConfig:
     """Global network configuration."""
     num_containers: int
@@ -122,6 +318,7 @@ class NetworkConfig:
     # Optional features
     enable_tcpdump: bool = False
     enable_nat: bool = False  # Enable internet access from containers (requires 'ip' command)
+    verify_connectivity: bool = True  # Ping each container's gateway after routing setup (off for headless runs)
     
     # Volume mounts (in addition to output_dir)
     # Format: ["/host/path:/container/path", "/host/path2:/container/path2:ro"]
@@ -138,12 +335,15 @@ class NetworkConfig:
 class RouterWrapper:
     """Wrapper for router management."""
     
-    def __init__(self, router_id: int, network_ip: ipaddress.IPv4Network, net: Containernet, max_eth: int = 100):
+    __slots__ = ('id', 'name', 'network_ip', 'main_ip', 'max_eth', 'eth_used',
+                 'routing_bindings', 'switch', 'router', '_net')
+    
+    def __init__(self, router_id: int, network_ip: ipaddress.IPv4Network, net: 'Containernet', max_eth: int = 100):
         self.id = router_id
         self.name = f"r{router_id}"
         self.network_ip = network_ip
         self.main_ip = f'{next(network_ip.hosts())}/24'
-        self.eth_available = [f'{self.name}-eth{eth}' for eth in range(max_eth)]
+        self.max_eth = max_eth
         self.eth_used = []
         self.routing_bindings = []
         self.switch = None
@@ -151,7 +351,11 @@ class RouterWrapper:
         self._net = net
     
     def get_eth(self) -> str:
-        eth = self.eth_available.pop(0)
+        # Interfaces are handed out in order: <name>-eth0, <name>-eth1, ...
+        index = len(self.eth_used)
+        if index >= self.max_eth:
+            raise IndexError(f"{self.name}: no interfaces left (max_eth={self.max_eth})")
+        eth = f'{self.name}-eth{index}'
         self.eth_used.append(eth)
         return eth
     
@@ -159,8 +363,9 @@ class RouterWrapper:
         self.routing_bindings.append((dest_network, via_ip, interface))
     
     def add_switch(self):
+        # Offloads on the switch ports are disabled host-wide by
+        # _disable_host_offload() once the network is started
         self.switch = self._net.addSwitch(f's{self.id}')
-        self.switch.cmd('ethtool -K', self.switch, 'gro off', 'tx off', 'rx off')
         self._net.addLink(
             self.switch, 
             self.router,
@@ -177,14 +382,34 @@ class ContainernetManager:
     """
     
     def __init__(self, config: NetworkConfig):
+        _import_mininet()
         self.config = config
         self.net = Containernet(controller=Controller, switch=PatchedOVSSwitch)
         self.routers: List[RouterWrapper] = []
         self.containers: Dict[int, ContainerConfig] = {}
+        # Flat views of the containers, refreshed by _index_containers()
+        self.ids: List[int] = []
+        self.ips: List[str] = []
+        self.ip_var_names: List[str] = []
+        self.alt_ip_var_names: List[str] = []
         self.switches = []
         self.resource_manager: Optional[ContainerResourceManager] = None
         self._started = False
         
+        # Per-container overrides, looked up once (empty dict when none are given)
+        overrides = config.container_overrides
+        self._overrides: Dict[int, Dict] = {i: overrides.get(i, {}) for i in range(config.num_containers)}
+        
+        # Per-container device/network types, resolved once (indexed by container id)
+        self._device_types = tuple(self._resolve_device_type(i) for i in range(config.num_containers))
+        self._network_types = tuple(self._resolve_network_type(i) for i in range(config.num_containers))
+        self._link_params: List[tuple] = []  # filled by setup_network()
+        
+        # Output directory mount shared by every container, and the full volume
+        # list of containers without volume overrides (the common, uniform case)
+        self._base_volume = self._normalize_volume_path(f"{config.output_dir}:/app/saved_output")
+        self._default_volumes = self._container_volumes({})
+        
         # Ensure output directory exists
         os.makedirs(config.output_dir, exist_ok=True)
     
@@ -206,6 +431,8 @@ class ContainernetManager:
              f"spread threshold {self.config.cpu_spread_threshold}\n")
         
         # Pre-register all containers with their device profiles
+        # (per-container lines at debug level, one summary at info)
+        profiled = 0
         for idx in range(self.config.num_containers):
             container_name = f"c{idx}"  # Short name to match container creation
             device_name = self._get_device_type_for_container(idx)
@@ -216,7 +443,8 @@ class ContainernetManager:
                     device_name=device_name, 
                     idx=idx
                 )
-                info(f"*** Registered {container_name} with device profile: {device_name}\n")
+                debug(f"*** Registered {container_name} with device profile: {device_name}\n")
+                profiled += 1
             else:
                 self.resource_manager.add_container(
                     container_name,
@@ -225,7 +453,10 @@ class ContainernetManager:
                     default_cores=self.config.default_cores_per_container,
                     default_ram_gib=self.config.default_ram_gib
                 )
-                info(f"*** Registered {container_name} with default allocation\n")
+                debug(f"*** Registered {container_name} with default allocation\n")
+        
+        info(f"*** Registered {self.config.num_containers} containers: {profiled} with device profiles, "
+             f"{self.config.num_containers - profiled} with default allocation\n")
         
         # Plan all allocations
         self.resource_manager.plan_allocations()
@@ -241,12 +472,20 @@ class ContainernetManager:
     
     def _get_device_type_for_container(self, container_id: int) -> Optional[str]:
         """Get device type for a specific container. Returns None for no constraints."""
+        return self._device_types[container_id]
+    
+    def _get_network_type_for_container(self, container_id: int) -> Optional[str]:
+        """Get network type for a specific container. Returns None for no limitations."""
+        return self._network_types[container_id]
+    
+    def _resolve_device_type(self, container_id: int) -> Optional[str]:
+        """Resolve the device type of a container from the configuration."""
         # Check per-container overrides first
-        overrides = self.config.container_overrides.get(container_id, {})
+        overrides = self._overrides[container_id]
         if 'device_type' in overrides:
             val = overrides['device_type']
             # Handle None/none/nan as "no constraints"
-            if val is None or (isinstance(val, str) and val.lower() in ('none', 'nan', '')):
+            if _is_empty(val):
                 return None
             return val
         
@@ -254,9 +493,7 @@ class ContainernetManager:
         device_type = self.config.device_type
         
         # Handle None/none/nan as "no constraints"
-        if device_type is None:
-            return None
-        if isinstance(device_type, str) and device_type.lower() in ('none', 'nan', ''):
+        if _is_empty(device_type):
             return None
         
         if isinstance(device_type, list):
@@ -267,25 +504,25 @@ class ContainernetManager:
                 else:
                     val = device_type[container_id - 1] if container_id <= len(device_type) else device_type[-1]
                 # Check if this specific value is None/none/nan
-                if val is None or (isinstance(val, str) and val.lower() in ('none', 'nan', '')):
+                if _is_empty(val):
                     return None
                 return val
             except IndexError:
                 val = device_type[-1] if device_type else None
-                if val is None or (isinstance(val, str) and val.lower() in ('none', 'nan', '')):
+                if _is_empty(val):
                     return None
                 return val
         
         return device_type
     
-    def _get_network_type_for_container(self, container_id: int) -> Optional[str]:
-        """Get network type for a specific container. Returns None for no limitations."""
+    def _resolve_network_type(self, container_id: int) -> Optional[str]:
+        """Resolve the network type of a container from the configuration."""
         # Check per-container overrides first
-        overrides = self.config.container_overrides.get(container_id, {})
+        overrides = self._overrides[container_id]
         if 'network_type' in overrides:
             val = overrides['network_type']
             # Handle None/none/nan as "no limitations"
-            if val is None or (isinstance(val, str) and val.lower() in ('none', 'nan', '')):
+            if _is_empty(val):
                 return None
             return val
         
@@ -293,9 +530,7 @@ class ContainernetManager:
         network_type = self.config.network_type
         
         # Handle None/none/nan as "no limitations"
-        if network_type is None:
-            return None
-        if isinstance(network_type, str) and network_type.lower() in ('none', 'nan', ''):
+        if _is_empty(network_type):
             return None
         
         if isinstance(network_type, list):
@@ -305,12 +540,12 @@ class ContainernetManager:
                 else:
                     val = network_type[container_id - 1] if container_id <= len(network_type) else network_type[-1]
                 # Check if this specific value is None/none/nan
-                if val is None or (isinstance(val, str) and val.lower() in ('none', 'nan', '')):
+                if _is_empty(val):
                     return None
                 return val
             except IndexError:
                 val = network_type[-1] if network_type else None
-                if val is None or (isinstance(val, str) and val.lower() in ('none', 'nan', '')):
+                if _is_empty(val):
                     return None
                 return val
         
@@ -323,6 +558,9 @@ class ContainernetManager:
         # Initialize resource manager first
         self._initialize_resource_manager()
         
+        # Resolve every container's link parameters once (profiles are seeded by id)
+        self._link_params = [self._compute_link_params(i) for i in range(self.config.num_containers)]
+        
         # Add controller
         self.net.addController('c0', port=6654)
         
@@ -343,9 +581,11 @@ class ContainernetManager:
     def _create_routers(self) -> None:
         """Create routers for each container."""
         info('*** Adding routers\n')
+        max_eth = self.config.num_containers + 10
         for i in range(self.config.num_containers):
-            network = ipaddress.ip_network(f'10.0.{i}.0/24')
-            router = RouterWrapper(i, network, self.net, self.config.num_containers + 10)
+            # (address, prefixlen) form: no CIDR string to build and split
+            network = ipaddress.IPv4Network(('10.0.%d.0' % i, 24))
+            router = RouterWrapper(i, network, self.net, max_eth)
             self.routers.append(router)
     
     def _create_switches(self) -> None:
@@ -357,46 +597,64 @@ class ContainernetManager:
         """Create mesh links between routers."""
         info('*** Adding router-router links\n')
         
-        for router1, router2 in itertools.combinations(self.routers, 2):
+        routers = self.routers
+        
+        # All router pairs (i < j) and their link subnet ids, e.g. (1, 2) -> 10.12.0.0/24
+        pairs = router_pair_links(np.array([router.id for router in routers], dtype=np.int64))
+        
+        # Link shaping depends only on the second router of the pair
+        shaping = [self._link_shaping(router.id) for router in routers]
+        
+        for i, j, link_id in pairs.tolist():
+            router1, router2 = routers[i], routers[j]
             intf1 = router1.get_eth()
             intf2 = router2.get_eth()
             
             # Calculate link IPs
-            link_id = int(''.join(sorted([str(router1.id), str(router2.id)])))
-            ip1 = f'10.{link_id}.0.1'
-            ip2 = f'10.{link_id}.0.2'
+            link_net = '10.%d.0.' % link_id
+            ip1 = link_net + '1'
+            ip2 = link_net + '2'
             
             # Add routing bindings
             router1.add_binding(router2.network_ip, ip2, intf1)
             router2.add_binding(router1.network_ip, ip1, intf2)
             
-            # Get link parameters using network_profile from resources.performance
-            delay, bw, jitter, loss = self._get_link_params(router2.id)
-            
-            # Build link parameters, only include non-zero/non-None values
-            link_params = {
-                'intfName1': intf1,
-                'intfName2': intf2,
-                'params1': {'ip': f'{ip1}/24'},
-                'params2': {'ip': f'{ip2}/24'},
-                'cls': TCLink,
-            }
-            
-            # Only add delay/jitter if > 0
-            if delay and delay > 0:
-                link_params['delay'] = f'{delay}ms'
-            if jitter and jitter > 0:
-                link_params['jitter'] = f'{jitter}ms'
-            # Only add bandwidth if specified (None = no limit)
-            if bw is not None:
-                link_params['bw'] = bw
-            # Only add loss if > 0
-            if loss and loss > 0:
-                link_params['loss'] = loss
-            
-            self.net.addLink(router1.router, router2.router, **link_params)
+            self.net.addLink(
+                router1.router, router2.router,
+                intfName1=intf1,
+                intfName2=intf2,
+                params1={'ip': f'{ip1}/24'},
+                params2={'ip': f'{ip2}/24'},
+                cls=TCLink,
+                **shaping[j]
+            )
+    
+    def _link_shaping(self, container_id: int) -> Dict[str, Any]:
+        """TCLink shaping arguments for a container's links (only non-zero/non-None values)."""
+        # Get link parameters using network_profile from resources.performance
+        delay, bw, jitter, loss = self._get_link_params(container_id)
+        
+        shaping = {}
+        # Only add delay/jitter if > 0
+        if delay and delay > 0:
+            shaping['delay'] = f'{delay}ms'
+        if jitter and jitter > 0:
+            shaping['jitter'] = f'{jitter}ms'
+        # Only add bandwidth if specified (None = no limit)
+        if bw is not None:
+            shaping['bw'] = bw
+        # Only add loss if > 0
+        if loss and loss > 0:
+            shaping['loss'] = loss
+        return shaping
     
     def _get_link_params(self, container_id: int) -> tuple:
+        """Link parameters of a container, as precomputed by setup_network()."""
+        if container_id < len(self._link_params):
+            return self._link_params[container_id]
+        return self._compute_link_params(container_id)
+    
+    def _compute_link_params(self, container_id: int) -> tuple:
         """
         Get link parameters for a container using network_profile.
         
@@ -407,7 +665,7 @@ class ContainernetManager:
         bandwidth=None tells TCLink to not apply bandwidth shaping.
         """
         # Check for per-container link overrides
-        overrides = self.config.container_overrides.get(container_id, {})
+        overrides = self._overrides[container_id]
         link_config = overrides.get('link', {})
         
         if link_config:
@@ -451,11 +709,22 @@ class ContainernetManager:
     def _configure_routing(self) -> None:
         """Configure routing tables on all routers."""
         info('*** Configuring routing tables\n')
-        cmd_template = "ip route add {dest} via {via} dev {interface}"
         
-        for router in self.routers:
-            for dest, via, interface in router.routing_bindings:
-                router.router.cmd(cmd_template.format(dest=dest, via=via, interface=interface))
+        # Each router has its own namespace and shell, so configure them concurrently
+        if self.routers:
+            with ThreadPoolExecutor(max_workers=min(32, len(self.routers))) as pool:
+                list(pool.map(self._configure_one_router_routing, self.routers))
+    
+    def _configure_one_router_routing(self, router: RouterWrapper) -> None:
+        """Install a router's routing table."""
+        if not router.routing_bindings:
+            return
+        cmd_template = "route add {dest} via {via} dev {interface}"
+        # All of the router's routes in one `ip -batch` call (one netlink session,
+        # one shell round-trip); -force keeps going past a failing entry
+        batch = '\\n'.join(cmd_template.format(dest=dest, via=via, interface=interface)
+                           for dest, via, interface in router.routing_bindings)
+        router.router.cmd(f"printf '{batch}\\n' | ip -force -batch -")
     
     def _normalize_volume_path(self, volume_spec: str) -> str:
         """
@@ -478,7 +747,7 @@ class ContainernetManager:
         
         # Convert relative path to absolute
         if not os.path.isabs(host_path):
-            host_path = os.path.abspath(host_path)
+            host_path = _abspath(host_path)
         
         # Reassemble volume specification
         if options:
@@ -515,25 +784,59 @@ class ContainernetManager:
         """Create all containers with their configurations."""
         info('*** Creating containers\n')
         
-        for router in self.routers:
-            container_config = self._build_container_config(router)
-            docker_container = self._create_docker_container(container_config)
+        # Configs are built sequentially (resource manager state), then the
+        # Docker nodes are constructed concurrently: that mostly waits on the
+        # Docker daemon, so the round-trips overlap. The nodes are added to the
+        # network on this thread, in router order, so the network bookkeeping
+        # (hosts, nameToNode, nextIP) is never shared between threads and
+        # net.hosts keeps a deterministic order
+        configs = [self._build_container_config(router) for router in self.routers]
+        if configs:
+            with ThreadPoolExecutor(max_workers=min(32, len(configs))) as pool:
+                docker_containers = list(pool.map(self._create_docker_container, configs))
+        else:
+            docker_containers = []
+        
+        for router, container_config, docker_container in zip(self.routers, configs, docker_containers):
+            # addDocker with a prebuilt node: Mininet's addHost bookkeeping only
+            self.net.addDocker(container_config.name, cls=lambda *args, node=docker_container, **kwargs: node)
             container_config.docker_container = docker_container
             container_config.router = router
             self.containers[router.id] = container_config
+        info(f"*** Created {len(configs)} containers\n")
         
+        self._index_containers()
         return self.containers
     
+    def _index_containers(self) -> None:
+        """Rebuild the id/IP lists used for {ip_N} and {cN_ip} template variables."""
+        self.ids = list(self.containers)
+        self.ips = [cfg.ip_address for cfg in self.containers.values()]
+        self.ip_var_names = [f'ip_{cid}' for cid in self.ids]
+        self.alt_ip_var_names = [f'c{cid}_ip' for cid in self.ids]
+    
+    def _container_volumes(self, overrides: Dict) -> List[str]:
+        """Volume list of a container: output_dir + extra_volumes + per-container volumes."""
+        volumes = [self._base_volume]
+        
+        # Convert relative paths to absolute paths (Docker requires absolute paths)
+        volumes.extend(self._normalize_volume_path(v) for v in self.config.extra_volumes)
+        volumes.extend(self._normalize_volume_path(v) for v in overrides.get('volumes', []))
+        
+        # Deduplicate volumes by container mount point (later entries override earlier ones)
+        return self._deduplicate_volumes(volumes)
+    
     def _build_container_config(self, router: RouterWrapper) -> ContainerConfig:
         """Build configuration for a single container."""
         container_id = router.id
         container_name = f"c{container_id}"  # Short name to avoid interface name limit (15 chars)
-        overrides = self.config.container_overrides.get(container_id, {})
+        overrides = self._overrides[container_id]
         
         # Base network info
         network_ip = router.network_ip
-        gateway = str(list(network_ip.hosts())[0])
-        container_ip = str(list(network_ip.hosts())[99])  # .100 address
+        base_address = network_ip.network_address
+        gateway = str(base_address + 1)  # .1 address (router)
+        container_ip = str(base_address + 100)  # .100 address
         
         # Get resource constraints from resource manager
         rm_config = None
@@ -541,19 +844,13 @@ class ContainernetManager:
             rm_config = self.resource_manager.get_container_config(container_name)
         
         # Build volumes list: output_dir + extra_volumes + per-container volumes
-        volumes = [f"{self.config.output_dir}:/app/saved_output"]
-        volumes.extend(self.config.extra_volumes)
-        volumes.extend(overrides.get('volumes', []))
-        
-        # Convert relative paths to absolute paths (Docker requires absolute paths)
-        volumes = [self._normalize_volume_path(v) for v in volumes]
-        
-        # Deduplicate volumes by container mount point (later entries override earlier ones)
-        volumes = self._deduplicate_volumes(volumes)
+        if 'volumes' in overrides:
+            volumes = self._container_volumes(overrides)
+        else:
+            volumes = list(self._default_volumes)
         
         # Build docker_args: global + per-container overrides
-        docker_args = dict(self.config.docker_args)
-        docker_args.update(overrides.get('docker_args', {}))
+        docker_args = {**self.config.docker_args, **overrides.get('docker_args', {})}
         
         # Build container config
         config = ContainerConfig(
@@ -572,12 +869,12 @@ class ContainernetManager:
         
         # Apply resource constraints from resource manager
         if rm_config:
-            config.cpu_period = int(rm_config.get('CpuPeriod', 0))
-            config.cpu_quota = int(rm_config.get('CpuQuota', 0))
-            config.cpu_shares = int(rm_config.get('CpuShares', 0))
+            config.cpu_period = _as_int(rm_config.get('CpuPeriod', 0))
+            config.cpu_quota = _as_int(rm_config.get('CpuQuota', 0))
+            config.cpu_shares = _as_int(rm_config.get('CpuShares', 0))
             config.cpuset_cpus = rm_config.get('CpusetCpus')
-            config.nano_cpus = int(rm_config.get('NanoCPUs', 0))
-            config.memory_limit = int(rm_config.get('Memory', 0))
+            config.nano_cpus = _as_int(rm_config.get('NanoCPUs', 0))
+            config.memory_limit = _as_int(rm_config.get('Memory', 0))
             config.effective_cpus = rm_config.get('EffectiveCpus', 0.0)
             
             # Merge environment variables
@@ -606,8 +903,8 @@ class ContainernetManager:
         
         return config
     
-    def _create_docker_container(self, config: ContainerConfig) -> Any:
-        """Create a Docker container in the network."""
+    def _docker_params(self, config: ContainerConfig) -> Dict[str, Any]:
+        """Build the addDocker keyword arguments for a container."""
         docker_params = {
             'name': config.name,
             'ip': config.subnet,
@@ -628,7 +925,7 @@ class ContainernetManager:
             docker_params['cpu_quota'] = config.cpu_quota
         if config.cpuset_cpus:
             docker_params['cpuset_cpus'] = config.cpuset_cpus
-            info(f"*** {config.name}: pinned to cores {config.cpuset_cpus}\n")
+            debug(f"*** {config.name}: pinned to cores {config.cpuset_cpus}\n")
         
         # Add environment variables
         if config.environment:
@@ -636,20 +933,23 @@ class ContainernetManager:
         
         # Add custom docker args (these can override above settings)
         if config.docker_args:
-            docker_params.update(config.docker_args)
-            info(f"*** {config.name}: custom docker_args applied: {list(config.docker_args.keys())}\n")
-        
-        info(f"*** {config.name}: creating container with image={config.image}\n")
+            debug(f"*** {config.name}: custom docker_args applied: {list(config.docker_args.keys())}\n")
+        return {**docker_params, **config.docker_args}
+    
+    def _create_docker_container(self, config: ContainerConfig) -> Any:
+        """
+        Create the Docker node of a container. The node is not added to the
+        network yet (see create_containers), so this is safe to run in threads.
+        """
+        docker_params = self._docker_params(config)
         
-        container = self.net.addDocker(**docker_params)
+        debug(f"*** {config.name}: creating container with image={config.image}\n")
         
-        # Disable network offloading
-        try:
-            container.cmd("ethtool -K eth0 gro off tx off rx off 2>/dev/null || true")
-        except:
-            pass
+        # Network offloading on eth0 is disabled together with the routing probe
+        # in _configure_one_container_routing (one shell round-trip for both)
+        container = Docker(**docker_params)
         
-        info(f"*** {config.name}: effective_cpus={config.effective_cpus:.2f}, "
+        debug(f"*** {config.name}: effective_cpus={config.effective_cpus:.2f}, "
              f"quota={config.cpu_quota}, cpuset={config.cpuset_cpus}\n")
         
         return container
@@ -670,154 +970,189 @@ class ContainernetManager:
         """
         info('*** Configuring container routing\n')
         
-        for container_id, config in self.containers.items():
-            container = config.docker_container
-            intf_name = f"{config.name}-eth0"
-            gateway = config.default_gateway
-            
-            # Check if 'ip' command exists and what type it is
-            check_ip = container.cmd("which ip 2>/dev/null").strip()
-            ip_version = container.cmd("ip -V 2>&1 || ip --version 2>&1 || echo 'unknown'").strip()
-            
-            if not check_ip:
-                # Try to install iproute2 (running as root)
-                info(f"*** {config.name}: 'ip' not found, attempting to install iproute2...\n")
-                container.cmd("apt-get update -qq 2>/dev/null && apt-get install -y -qq iproute2 2>/dev/null || true")
-                check_ip = container.cmd("which ip 2>/dev/null").strip()
-            
-            if not check_ip:
-                info(f"*** {config.name}: WARNING - 'ip' command not available, cannot configure routing\n")
-                continue
-            
-            info(f"*** {config.name}: using ip at {check_ip} ({ip_version[:50]})\n")
-            
-            # Check if this is busybox ip (limited functionality)
-            is_busybox = 'BusyBox' in ip_version or 'busybox' in check_ip.lower()
-            if is_busybox:
-                info(f"*** {config.name}: detected BusyBox ip - using compatible commands\n")
-            
-            # Get Docker's default gateway before we change routes
-            docker_gateway = container.cmd("ip route | grep default | awk '{print $3}'").strip()
-            docker_iface = container.cmd("ip route | grep default | awk '{print $5}'").strip()
-            
-            # Store Docker gateway info for later (used by _configure_internet_routing)
-            config.docker_gateway = docker_gateway
-            config.docker_iface = docker_iface
-            
-            # First, check current interface state
-            intf_check = container.cmd(f"ip link show {intf_name} 2>&1")
-            if 'does not exist' in intf_check or 'not found' in intf_check:
-                info(f"*** {config.name}: ERROR - interface {intf_name} does not exist!\n")
-                # List available interfaces for debugging
-                all_intfs = container.cmd("ip link show 2>/dev/null")
-                info(f"*** {config.name}: available interfaces:\n{all_intfs}\n")
-                continue
-            
-            info(f"*** {config.name}: bringing up interface {intf_name}\n")
-            
-            # Bring the interface UP
-            result = container.cmd(f"ip link set {intf_name} up 2>&1")
-            if result.strip():
-                # Check if it's a permission error or other issue
-                if 'Operation not permitted' in result:
-                    info(f"*** {config.name}: ERROR - cannot bring up interface (not privileged?): {result.strip()}\n")
-                elif 'RTNETLINK' in result:
-                    info(f"*** {config.name}: kernel error bringing up interface: {result.strip()}\n")
-                else:
-                    info(f"*** {config.name}: ip link set up: {result.strip()}\n")
-            
-            # Give the interface a moment to come up
-            import time
-            time.sleep(0.5)
-            
-            # Verify interface is up
-            intf_state = container.cmd(f"ip link show {intf_name} 2>/dev/null").strip()
-            if 'UP' in intf_state or 'LOWER_UP' in intf_state:
-                info(f"*** {config.name}: interface {intf_name} is UP\n")
-            else:
-                info(f"*** {config.name}: WARNING - interface {intf_name} may not be fully up\n")
-                info(f"*** {config.name}: state: {intf_state[:200]}\n")
-            
-            # Verify IP address is assigned
-            ip_addr = container.cmd(f"ip addr show {intf_name} 2>/dev/null | grep 'inet '").strip()
-            if ip_addr:
-                info(f"*** {config.name}: IP assigned: {ip_addr}\n")
-            else:
-                info(f"*** {config.name}: WARNING - no IP address on {intf_name}\n")
-            
+        # Containers are configured independently (each has its own shell), so overlap them
+        configs = list(self.containers.values())
+        if configs:
+            with ThreadPoolExecutor(max_workers=min(16, len(configs))) as pool:
+                list(pool.map(self._configure_one_container_routing, configs))
+    
+    def _configure_one_container_routing(self, config: ContainerConfig) -> None:
+        """Configure routing on a single container (see _configure_container_routing)."""
+        # Messages are logged with a single info() call, so the output of
+        # containers configured concurrently does not interleave
+        msgs: List[str] = []
+        try:
+            self._route_container(config, msgs.append)
+        finally:
+            if msgs:
+                info(''.join(msgs))
+    
+    def _route_container(self, config: ContainerConfig, log: Callable[[str], None]) -> None:
+        """Body of _configure_one_container_routing, writing messages through log()."""
+        container = config.docker_container
+        intf_name = f"{config.name}-eth0"
+        gateway = config.default_gateway
+        verify = self.config.verify_connectivity
+        
+        # Everything runs in a single round-trip: disable offloading on eth0,
+        # find the 'ip' binary and type, Docker's default gateway (before we
+        # change routes) and the Containernet interface, then - only if both
+        # 'ip' and the interface are there - bring the interface up, replace
+        # Docker's default route with Containernet's and verify
+        script = _sectioned_script([
+            ('offload', "ethtool -K eth0 gro off tx off rx off 2>/dev/null || true"),
+            ('ip', "which ip 2>/dev/null"),
+            ('ip_version', "ip -V 2>&1 || ip --version 2>&1 || echo 'unknown'"),
+            ('docker_gateway', "ip route | grep default | awk '{print $3}'"),
+            ('docker_iface', "ip route | grep default | awk '{print $5}'"),
+            ('intf', f"ip link show {intf_name} 2>&1"),
+        ]) + (
+            f" ; if which ip >/dev/null 2>&1 && ip link show {intf_name} >/dev/null 2>&1; then "
+        ) + _sectioned_script([
+            ('up', f"ip link set {intf_name} up 2>&1"),
+            # Poll until the interface comes up (bounded by _IFACE_UP_BACKOFF)
+            ('state', f"{_wait_iface_up_script(intf_name)} ; ip link show {intf_name} 2>/dev/null"),
+            ('addr', f"ip addr show {intf_name} 2>/dev/null | grep 'inet '"),
             # Step 1: Delete Docker's default route (we want Containernet as primary)
-            container.cmd("ip route del default 2>/dev/null || true")
-            
             # Step 2: Add route for container-to-container traffic via Containernet
-            result = container.cmd(f"ip route add 10.0.0.0/8 via {gateway} dev {intf_name} 2>&1")
-            if result.strip():
-                if 'File exists' in result or 'RTNETLINK answers: File exists' in result:
-                    info(f"*** {config.name}: route 10.0.0.0/8 already exists\n")
-                elif 'Network is unreachable' in result:
-                    info(f"*** {config.name}: ERROR - gateway {gateway} unreachable (interface may be down)\n")
-                else:
-                    info(f"*** {config.name}: route add result: {result.strip()}\n")
-            
+            ('route_net', f"ip route del default 2>/dev/null || true ; "
+                          f"ip route add 10.0.0.0/8 via {gateway} dev {intf_name} 2>&1"),
             # Step 3: Set Containernet as default (for container traffic)
-            result = container.cmd(f"ip route add default via {gateway} dev {intf_name} 2>&1")
-            if result.strip():
-                if 'File exists' in result or 'RTNETLINK answers: File exists' in result:
-                    info(f"*** {config.name}: default route already exists\n")
-                elif 'Network is unreachable' in result:
-                    info(f"*** {config.name}: ERROR - cannot set default route, gateway unreachable\n")
-                else:
-                    info(f"*** {config.name}: default route result: {result.strip()}\n")
-            
-            # Show final routes for verification
-            routes = container.cmd("ip route 2>/dev/null")
-            info(f"*** {config.name} final routes:\n{routes}\n")
-            
-            # Verify connectivity to gateway
-            ping_result = container.cmd(f"ping -c 1 -W 1 {gateway} 2>&1")
-            if '1 received' in ping_result or '1 packets received' in ping_result:
-                info(f"*** {config.name}: gateway {gateway} is reachable ✓\n")
+            ('route_default', f"ip route add default via {gateway} dev {intf_name} 2>&1"),
+        ] + ([
+            ('routes', "ip route 2>/dev/null"),
+            ('ping', f"{_ping_cmd(gateway, 1)} && echo OK"),
+        ] if verify else [])) + " ; fi"
+        out = _parse_sections(container.cmd(script))
+        
+        if not out['ip']:
+            # Try to install iproute2 (running as root)
+            log(f"*** {config.name}: 'ip' not found, attempting to install iproute2...\n")
+            out = _parse_sections(container.cmd(
+                "apt-get update -qq 2>/dev/null && apt-get install -y -qq iproute2 2>/dev/null || true ; " + script
+            ))
+        
+        check_ip = out['ip']
+        ip_version = out['ip_version']
+        if not check_ip:
+            log(f"*** {config.name}: WARNING - 'ip' command not available, cannot configure routing\n")
+            return
+        
+        log(f"*** {config.name}: using ip at {check_ip} ({ip_version[:50]})\n")
+        
+        # Check if this is busybox ip (limited functionality)
+        is_busybox = 'BusyBox' in ip_version or 'busybox' in check_ip.lower()
+        if is_busybox:
+            log(f"*** {config.name}: detected BusyBox ip - using compatible commands\n")
+        
+        # Store Docker gateway info for later (used by _configure_internet_routing)
+        config.docker_gateway = out['docker_gateway']
+        config.docker_iface = out['docker_iface']
+        
+        # First, check current interface state
+        intf_check = out['intf']
+        if 'does not exist' in intf_check or 'not found' in intf_check or 'up' not in out:
+            log(f"*** {config.name}: ERROR - interface {intf_name} does not exist!\n")
+            # List available interfaces for debugging
+            all_intfs = container.cmd("ip link show 2>/dev/null")
+            log(f"*** {config.name}: available interfaces:\n{all_intfs}\n")
+            return
+        
+        log(f"*** {config.name}: bringing up interface {intf_name}\n")
+        
+        result = out['up']
+        if result:
+            # Check if it's a permission error or other issue
+            if 'Operation not permitted' in result:
+                log(f"*** {config.name}: ERROR - cannot bring up interface (not privileged?): {result}\n")
+            elif 'RTNETLINK' in result:
+                log(f"*** {config.name}: kernel error bringing up interface: {result}\n")
             else:
-                info(f"*** {config.name}: WARNING - cannot ping gateway {gateway}\n")
-    
+                log(f"*** {config.name}: ip link set up: {result}\n")
+        
+        # Verify interface is up
+        intf_state = out['state']
+        if 'UP' in intf_state or 'LOWER_UP' in intf_state:
+            log(f"*** {config.name}: interface {intf_name} is UP\n")
+        else:
+            log(f"*** {config.name}: WARNING - interface {intf_name} may not be fully up\n")
+            log(f"*** {config.name}: state: {intf_state[:200]}\n")
+        
+        # Verify IP address is assigned
+        ip_addr = out['addr']
+        if ip_addr:
+            log(f"*** {config.name}: IP assigned: {ip_addr}\n")
+        else:
+            log(f"*** {config.name}: WARNING - no IP address on {intf_name}\n")
+        
+        result = _classify_route_result(out['route_net'])
+        if result == 'exists':
+            log(f"*** {config.name}: route 10.0.0.0/8 already exists\n")
+        elif result == 'unreachable':
+            log(f"*** {config.name}: ERROR - gateway {gateway} unreachable (interface may be down)\n")
+        elif result:
+            log(f"*** {config.name}: route add result: {result}\n")
+        
+        result = _classify_route_result(out['route_default'])
+        if result == 'exists':
+            log(f"*** {config.name}: default route already exists\n")
+        elif result == 'unreachable':
+            log(f"*** {config.name}: ERROR - cannot set default route, gateway unreachable\n")
+        elif result:
+            log(f"*** {config.name}: default route result: {result}\n")
+        
+        if not verify:
+            return
+        
+        # Show final routes for verification
+        log(f"*** {config.name} final routes:\n{out['routes']}\n")
+        
+        # Verify connectivity to gateway
+        if out['ping'] == 'OK':
+            log(f"*** {config.name}: gateway {gateway} is reachable ✓\n")
+        else:
+            log(f"*** {config.name}: WARNING - cannot ping gateway {gateway}\n")
+
     def _configure_nat(self) -> None:
         """Configure NAT for internet access from containers."""
         info('*** Configuring NAT for internet access\n')
         
         # Find the host's external interface (the one with default route)
         try:
-            import subprocess
-            result = subprocess.run(
-                ["ip", "route", "show", "default"],
+            host_interface = _default_route_iface()
+            if not host_interface:
+                info("*** Warning: No default route found, NAT not configured\n")
+                return
+            
+            # Enable IP forwarding
+            try:
+                with open('/proc/sys/net/ipv4/ip_forward', 'w') as f:
+                    f.write('1')
+            except OSError:
+                pass
+            
+            rules = {
+                # NAT (masquerading) for container subnets
+                'nat': [f"POSTROUTING -s 10.0.0.0/8 -o {host_interface} -j MASQUERADE"],
+                # Allow forwarding
+                'filter': [
+                    f"FORWARD -i {host_interface} -o s+ -m state --state RELATED,ESTABLISHED -j ACCEPT",
+                    f"FORWARD -o {host_interface} -i s+ -j ACCEPT",
+                ],
+            }
+            
+            # Rules left by a previous run are deleted before being re-added,
+            # and the whole set is applied in one iptables-restore call
+            existing = subprocess.run([_IPTABLES_SAVE], capture_output=True, text=True).stdout
+            restore = subprocess.run(
+                [_IPTABLES_RESTORE, "-n"],
+                input=_iptables_ruleset(rules, set(existing.splitlines())),
                 capture_output=True, text=True
             )
-            # Parse: "default via 192.168.1.1 dev eth0 ..."
-            if result.stdout:
-                parts = result.stdout.split()
-                if 'dev' in parts:
-                    dev_idx = parts.index('dev')
-                    host_interface = parts[dev_idx + 1]
-                    
-                    # Enable IP forwarding
-                    os.system("sysctl -w net.ipv4.ip_forward=1 >/dev/null 2>&1")
-                    
-                    # Set up NAT (masquerading) for container subnets
-                    # First, clean up any existing rules for our subnets
-                    os.system(f"iptables -t nat -D POSTROUTING -s 10.0.0.0/8 -o {host_interface} -j MASQUERADE 2>/dev/null")
-                    
-                    # Add NAT rule
-                    os.system(f"iptables -t nat -A POSTROUTING -s 10.0.0.0/8 -o {host_interface} -j MASQUERADE")
-                    
-                    # Allow forwarding
-                    os.system(f"iptables -D FORWARD -i {host_interface} -o s+ -m state --state RELATED,ESTABLISHED -j ACCEPT 2>/dev/null")
-                    os.system(f"iptables -D FORWARD -o {host_interface} -i s+ -j ACCEPT 2>/dev/null")
-                    os.system(f"iptables -A FORWARD -i {host_interface} -o s+ -m state --state RELATED,ESTABLISHED -j ACCEPT")
-                    os.system(f"iptables -A FORWARD -o {host_interface} -i s+ -j ACCEPT")
-                    
-                    info(f"*** NAT configured on interface {host_interface}\n")
-                else:
-                    info("*** Warning: Could not determine host interface for NAT\n")
+            if restore.returncode == 0:
+                info(f"*** NAT configured on interface {host_interface}\n")
             else:
-                info("*** Warning: No default route found, NAT not configured\n")
+                info(f"*** Warning: iptables-restore failed: {restore.stderr.strip()}\n")
         except Exception as e:
             info(f"*** Warning: Failed to configure NAT: {e}\n")
     
@@ -825,21 +1160,27 @@ class ContainernetManager:
         """Add routes for internet access via Docker's network."""
         info('*** Configuring internet routing\n')
         
-        for container_id, config in self.containers.items():
-            container = config.docker_container
-            
-            # Use stored Docker gateway (captured before we changed routes)
-            docker_gateway = getattr(config, 'docker_gateway', None)
-            docker_iface = getattr(config, 'docker_iface', None)
-            
-            if not docker_gateway or not docker_iface:
-                info(f"*** {config.name}: No Docker gateway info, skipping internet route\n")
-                continue
-            
-            # Add route for internet traffic via Docker gateway (with higher metric so 10.x.x.x takes priority)
-            container.cmd(f"ip route add default via {docker_gateway} dev {docker_iface} metric 100 2>/dev/null || true")
-            
-            info(f"*** {config.name}: internet via {docker_gateway} ({docker_iface})\n")
+        configs = list(self.containers.values())
+        if configs:
+            with ThreadPoolExecutor(max_workers=min(32, len(configs))) as pool:
+                list(pool.map(self._configure_one_internet_route, configs))
+    
+    def _configure_one_internet_route(self, config: ContainerConfig) -> None:
+        """Add the internet route on a single container (see _configure_internet_routing)."""
+        container = config.docker_container
+        
+        # Use stored Docker gateway (captured before we changed routes)
+        docker_gateway = config.docker_gateway
+        docker_iface = config.docker_iface
+        
+        if not docker_gateway or not docker_iface:
+            info(f"*** {config.name}: No Docker gateway info, skipping internet route\n")
+            return
+        
+        # Add route for internet traffic via Docker gateway (with higher metric so 10.x.x.x takes priority)
+        container.cmd(f"ip route add default via {docker_gateway} dev {docker_iface} metric 100 2>/dev/null || true")
+        
+        info(f"*** {config.name}: internet via {docker_gateway} ({docker_iface})\n")
     
     def start(self) -> None:
         """Start the network."""
@@ -851,9 +1192,7 @@ class ContainernetManager:
         self._started = True
         
         # Disable network offloading on host
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        disable_script = os.path.join(script_dir, "resources", "disable_offload.sh")
-        os.system(f"bash {disable_script} >/dev/null 2>&1")
+        _disable_host_offload()
         
         # Configure container routing AFTER network start
         self._configure_container_routing()
@@ -864,7 +1203,6 @@ class ContainernetManager:
             self._configure_internet_routing()
         
         # Brief pause for network stabilization
-        import time
         time.sleep(max(2, self.config.default_delay_ms / 2))
     
     def stop(self) -> None:
@@ -884,14 +1222,19 @@ class ContainernetManager:
         
         info('*** Network Debug ***\n')
         
+        # Every container and router has its own shell, so the probes below are
+        # run concurrently per node and reported in order afterwards
+        containers = list(self.containers.items())
+        configs = [config for _, config in containers]
+        workers = min(32, max(1, len(configs) + len(self.routers)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            container_views = list(pool.map(_ip_view, [c.docker_container for c in configs]))
+            router_views = list(pool.map(_ip_view, [r.router for r in self.routers]))
+            peer_results = list(pool.map(self._ping_peers, configs))
+            internet_results = list(pool.map(self._ping_internet, configs))
+        
         # Container info
-        for cid, config in self.containers.items():
-            container = config.docker_container
-            
-            # Get interfaces
-            interfaces = container.cmd('ip -o addr show')
-            routes = container.cmd('ip route')
-            
+        for (cid, config), (interfaces, routes) in zip(containers, container_views):
             debug_info['containers'][config.name] = {
                 'ip': config.ip_address,
                 'gateway': config.default_gateway,
@@ -906,10 +1249,7 @@ class ContainernetManager:
             info(f'Routes:\n{routes}\n')
         
         # Router info
-        for router in self.routers:
-            interfaces = router.router.cmd('ip -o addr show')
-            routes = router.router.cmd('ip route')
-            
+        for router, (interfaces, routes) in zip(self.routers, router_views):
             debug_info['routers'][router.name] = {
                 'interfaces': interfaces.strip(),
                 'routes': routes.strip()
@@ -921,40 +1261,23 @@ class ContainernetManager:
         
         # Connectivity tests
         info('\n=== Connectivity Tests ===\n')
-        for cid, config in self.containers.items():
-            container = config.docker_container
-            
-            # Ping gateway
-            gateway_result = container.cmd(f'ping -c 1 -W 2 {config.default_gateway}')
-            gateway_ok = '1 received' in gateway_result
+        for config, (gateway_ok, peers) in zip(configs, peer_results):
             info(f'{config.name} -> gateway ({config.default_gateway}): {"OK" if gateway_ok else "FAIL"}\n')
             
-            # Ping other containers
-            for other_cid, other_config in self.containers.items():
-                if other_cid != cid:
-                    ping_result = container.cmd(f'ping -c 1 -W 2 {other_config.ip_address}')
-                    ping_ok = '1 received' in ping_result
-                    debug_info['connectivity'].append({
-                        'from': config.name,
-                        'to': other_config.name,
-                        'target_ip': other_config.ip_address,
-                        'success': ping_ok
-                    })
-                    info(f'{config.name} -> {other_config.name} ({other_config.ip_address}): {"OK" if ping_ok else "FAIL"}\n')
+            for other_config, ping_ok in peers:
+                debug_info['connectivity'].append({
+                    'from': config.name,
+                    'to': other_config.name,
+                    'target_ip': other_config.ip_address,
+                    'success': ping_ok
+                })
+                info(f'{config.name} -> {other_config.name} ({other_config.ip_address}): {"OK" if ping_ok else "FAIL"}\n')
         
         # Internet connectivity test
         info('\n=== Internet Connectivity Tests ===\n')
         debug_info['internet'] = []
-        test_targets = [
-            ('8.8.8.8', 'Google DNS'),
-            ('1.1.1.1', 'Cloudflare DNS'),
-        ]
-        
-        for cid, config in self.containers.items():
-            container = config.docker_container
-            for target_ip, target_name in test_targets:
-                ping_result = container.cmd(f'ping -c 1 -W 3 {target_ip}')
-                ping_ok = '1 received' in ping_result
+        for config, targets in zip(configs, internet_results):
+            for target_ip, target_name, ping_ok in targets:
                 debug_info['internet'].append({
                     'from': config.name,
                     'target': target_name,
@@ -962,13 +1285,31 @@ class ContainernetManager:
                     'success': ping_ok
                 })
                 info(f'{config.name} -> {target_name} ({target_ip}): {"OK" if ping_ok else "FAIL"}\n')
-                
-                # Only test one target per container if first succeeds
-                if ping_ok:
-                    break
         
         return debug_info
     
+    def _ping_peers(self, config: ContainerConfig) -> Tuple[bool, List[Tuple[ContainerConfig, bool]]]:
+        """Ping the gateway and every other container from one container."""
+        others = [other for other in self.containers.values() if other.id != config.id]
+        reachable = _ping_all(config.docker_container,
+                              [config.default_gateway] + [other.ip_address for other in others], 2)
+        return (config.default_gateway in reachable,
+                [(other, other.ip_address in reachable) for other in others])
+    
+    def _ping_internet(self, config: ContainerConfig) -> List[Tuple[str, str, bool]]:
+        """Ping the internet test targets from one container."""
+        reachable = _ping_all(config.docker_container, [ip for ip, _ in _INTERNET_TEST_TARGETS], 3)
+        
+        results = []
+        for target_ip, target_name in _INTERNET_TEST_TARGETS:
+            ping_ok = target_ip in reachable
+            results.append((target_ip, target_name, ping_ok))
+            
+            # Only report one target per container if first succeeds
+            if ping_ok:
+                break
+        return results
+    
     def get_container(self, container_id: int) -> Optional[ContainerConfig]:
         """Get container configuration by ID."""
         return self.containers.get(container_id)
@@ -993,7 +1334,7 @@ class ContainernetManager:
         filepath = filepath or os.path.join(self.config.output_dir, 'network_topology.json')
         
         topology = {
-            'timestamp': datetime.datetime.now().isoformat(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
             'num_containers': self.config.num_containers,
             'host_score': self.config.host_single_core_score,
             'routers': [],
@@ -1043,8 +1384,15 @@ class ContainernetManager:
         if self.resource_manager:
             topology['cpu_allocation_summary'] = self.resource_manager.get_allocation_summary()
         
-        with open(filepath, 'w') as f:
-            json.dump(topology, f, indent=2, default=str)
+        # Write to a temporary file next to the target and swap it in, so the
+        # topology file is never left half-written
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(os.path.abspath(filepath)),
+                                         prefix='.topology-', delete=False) as f:
+            f.write(_json_pretty(topology))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(f.name, 0o644)  # NamedTemporaryFile creates the file 0600
+        os.replace(f.name, filepath)
         
         info(f'*** Topology saved to {filepath}\n')
         return topology
@@ -1054,48 +1402,46 @@ def create_network_config_from_dict(config_dict: dict, output_dir: str) -> Netwo
     """Create NetworkConfig from a dictionary (e.g., parsed YAML)."""
     # Support both nested 'containernet' section and flat config
     containernet_config = config_dict.get('containernet', config_dict)
+    get = containernet_config.get
     
     # Calculate num_containers: either explicit or clients + 1 (for server)
-    num_containers = containernet_config.get('num_containers')
+    num_containers = get('num_containers')
     if num_containers is None:
-        clients = containernet_config.get('clients', 1)
+        clients = get('clients', 1)
         num_containers = clients + 1
     
     network_config = NetworkConfig(
         num_containers=num_containers,
-        default_image=containernet_config.get('image_name', 'ubuntu:latest'),
+        default_image=get('image_name', 'ubuntu:latest'),
         output_dir=output_dir,
         # Default link parameters (0 = no limitation)
-        default_delay_ms=containernet_config.get('default_delay_ms', 0.0),
-        default_bandwidth_mbps=containernet_config.get('default_bandwidth_mbps', 0),
-        default_jitter_ms=containernet_config.get('default_jitter_ms', 0.0),
+        default_delay_ms=get('default_delay_ms', 0.0),
+        default_bandwidth_mbps=get('default_bandwidth_mbps', 0),
+        default_jitter_ms=get('default_jitter_ms', 0.0),
         # Resource management defaults
-        host_single_core_score=containernet_config.get('host_single_core_score', 1079),
-        device_variance=containernet_config.get('device_variance', 0.2),
-        cpu_spread_threshold=containernet_config.get('cpu_spread_threshold', 0.8),
-        default_cores_per_container=containernet_config.get('default_cores_per_container', 1),
-        default_ram_gib=containernet_config.get('default_ram_gib', 2.0),
-        allow_overscaling=containernet_config.get('allow_overscaling', True),
+        host_single_core_score=get('host_single_core_score', 1079),
+        device_variance=get('device_variance', 0.2),
+        cpu_spread_threshold=get('cpu_spread_threshold', 0.8),
+        default_cores_per_container=get('default_cores_per_container', 1),
+        default_ram_gib=get('default_ram_gib', 2.0),
+        allow_overscaling=get('allow_overscaling', True),
         # Device/network profiles (None = no constraints/limitations)
-        device_type=containernet_config.get('device_type'),
-        network_type=containernet_config.get('network_type'),
+        device_type=get('device_type'),
+        network_type=get('network_type'),
         # Features
-        enable_tcpdump=containernet_config.get('enable_tcpdump', False),
-        enable_nat=containernet_config.get('enable_nat', False),  # Default: no internet, only container-to-container
+        enable_tcpdump=get('enable_tcpdump', False),
+        enable_nat=get('enable_nat', False),  # Default: no internet, only container-to-container
+        verify_connectivity=get('verify_connectivity', True),
         # Extra volumes and docker args
-        extra_volumes=containernet_config.get('volumes', []),
-        docker_args=containernet_config.get('docker_args', {})
+        extra_volumes=get('volumes', []),
+        docker_args=get('docker_args', {})
     )
     
     # Process per-container overrides from 'nodes' list
-    container_overrides = {}
-    nodes = containernet_config.get('nodes', [])
-    
-    for node in nodes:
-        node_id = node.get('id')
-        if node_id is not None:
-            container_overrides[node_id] = node
-    
-    network_config.container_overrides = container_overrides
+    network_config.container_overrides = {
+        node_id: node
+        for node in get('nodes', [])
+        if (node_id := node.get('id')) is not None
+    }
     
     return network_config
@@ -12,7 +12,6 @@ class PatchedOVSSwitch(_OVSSwitch):
     OVSVersion = '2.5'   # any >= '2.0' is fine for the check
     
 import ipaddress
-import itertools
 import math
 import os
 import time
@@ -22,15 +21,33 @@ import yaml
 import docker
 import argparse
 import random
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from resources.performance import (
     device_profile, 
     network_profile,
     ContainerResourceManager,
     CPUAllocator,
     load_profile_data,
-    perturb_device
+    perturb_device,
+    router_pair_links
 )
 
+# LibYAML C loader when PyYAML was built with it, pure-Python SafeLoader otherwise
+_YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Parsed YAML files, keyed by (absolute path, mtime)
+_yaml_cache = {}
+
+def _load_yaml(path):
+    """Parse a YAML file, reusing the previous result while the file is unchanged."""
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _yaml_cache:
+        with open(path, "r") as stream:
+            _yaml_cache[key] = yaml.load(stream, Loader=_YAMLLoader)
+    return _yaml_cache[key]
+
 first = False
 
 # FIXED/DEFAULT values
@@ -50,6 +67,12 @@ ROUTER_DELAY_MS = 12
 ROUTER_BW = 80
 ROUTER_JIT = 2
 
+# ethtool -K arguments disabling every offload feature on an interface
+OFFLOAD_FEATURES = "gro off tx off rx off lro off gso off tso off sg off rxvlan off txvlan off rxhash off ufo off"
+
+# Protocols whose server listens on UDP: no TCP readiness probe is possible
+UDP_PROTOCOLS = frozenset({'coap'})
+
 # Command line arguments
 parser = argparse.ArgumentParser()
 parser.add_argument('--name', help='pass the framework config file folder')
@@ -98,11 +121,10 @@ if config:
     
     info(f"Using config file: {config}\n")
     
-    with open(config, "r") as stream:
-        try:
-            config_data = yaml.safe_load(stream)
-        except yaml.YAMLError as exc:
-            error(exc)
+    try:
+        config_data = _load_yaml(config)
+    except yaml.YAMLError as exc:
+        error(exc)
     
     experiment_name = config_data.get('experiment_name', "None_Experiment")
     clients = config_data.get('clients', CLIENTS)
@@ -141,6 +163,8 @@ if config:
     info(f"Config base name: {config_base}\n")
     info(f"Output folder name: {folder_name}\n")
     
+# Per-node overrides indexed by id (reversed so the first entry for an id wins)
+_node_cfg_by_id = {n['id']: n for n in reversed(node_configs) if 'id' in n}
 
 image_name_str = image_name.split("/")[-1] if "/" in image_name else image_name
 image_name_str = image_name_str.split(":")[0] if ":" in image_name_str else image_name_str
@@ -436,6 +460,10 @@ def save_network_allocations(container_list_full, routers, output_dir):
 
 
 class MyContainer:
+    __slots__ = ('fl_type', 'id', 'name', 'router_ip', 'default_route', 'address', 'address_2',
+                 'bind_port', 'master', 'node_config', 'custom_image', 'custom_command',
+                 'cpu_period', 'cpu_share', 'cpu_quota', 'nano_cpu', 'cpu', 'ram', 'cpuset_cpus')
+
     def __init__(self, _id, fl_type, router_ip, node_config=None, cpu_period=0, cpu_share=0, 
                  cpu_quota=0, nano_cpu=0, cpu=0, ram="", cpuset_cpus=None):
         self.fl_type = fl_type
@@ -470,6 +498,9 @@ class MyContainer:
         self.master = new_master
 
 class MyRouter:
+    __slots__ = ('id', 'name', 'networkIP', 'mainIP', 'eth_available', 'switch', 'eth_used',
+                 'routing_binding', 'router')
+
     def __init__(self, _id, networkIP):
         self.id = _id
         self.name = "r{}".format(self.id)
@@ -524,10 +555,7 @@ def add_variability(value, variation_percentage=0.3):
 
 def get_node_config(node_id):
     """Get configuration for a specific node"""
-    for node in node_configs:
-        if node.get('id') == node_id:
-            return node
-    return {}
+    return _node_cfg_by_id.get(node_id, {})
 
 def core_network():
     net.addController('c0', port=6654)
@@ -540,11 +568,14 @@ def core_network():
     _switches = [r.add_switch() for r in _routers]
 
     info('*** Adding router-router links\n')
-    for (router1, router2) in list(itertools.combinations(_routers, 2)):
+    # All router pairs (i < j) and their link subnet ids, e.g. (1, 2) -> 10.12.0.0/24
+    pairs = router_pair_links(np.array([router.id for router in _routers], dtype=np.int64))
+    for i, j, link_id in pairs.tolist():
+        router1, router2 = _routers[i], _routers[j]
         intf_name1 = router1.get_eth()
         intf_name2 = router2.get_eth()
-        params1 = '10.{}.0.1'.format(int(''.join(sorted(str(e) for e in [router1.id, router2.id]))), reverse=True)
-        params2 = '10.{}.0.2'.format(int(''.join(sorted(str(e) for e in [router1.id, router2.id]))), reverse=True)
+        params1 = f'10.{link_id}.0.1'
+        params2 = f'10.{link_id}.0.2'
 
         router1.add_binding((router2.networkIP, params2, intf_name1))
         router2.add_binding((router1.networkIP, params1, intf_name2))
@@ -607,7 +638,7 @@ def create_mqtt_broker(ps_router):
     )
     
     # Disable network offload features
-    mqtt_broker_container.cmd("ethtool -K eth0 gro off tx off rx off")
+    mqtt_broker_container.cmd(f"ethtool -K eth0 {OFFLOAD_FEATURES}")
     
     # Link the broker to the PS switch (router 0's switch)
     net.addLink(mqtt_broker_container, ps_router.switch, cls=TCLink)
@@ -646,9 +677,7 @@ def create_containers(fl_type, _routers, host_list=None):
             docker_params['cpuset_cpus'] = container.cpuset_cpus
             info(f"*** {container.name}: pinned to cores {container.cpuset_cpus}\n")
         
-        dck = net.addDocker(**docker_params)
-        dck.cmd("ethtool -K eth0 gro off tx off rx off")
-        return dck
+        return net.addDocker(**docker_params)
 
     if host_list is None:
         host_list = []
@@ -714,6 +743,29 @@ def add_routing(container_list_full):
     for cli, cli_cls in zip(container_list, container_class):
         cli.cmd("ip route add 10.0.0.0/16 via {} dev {}-eth0".format(cli_cls.default_route, cli_cls.name))
 
+def disable_offloading(container_list):
+    """Disable offloading on Docker's eth0 and the Containernet interface of
+    every container, one exec per container (run once, after the links exist)."""
+    if not container_list:
+        return
+    with ThreadPoolExecutor(max_workers=min(32, len(container_list))) as pool:
+        list(pool.map(lambda c: c.cmd(f"ethtool -K eth0 {OFFLOAD_FEATURES} ; "
+                                      f"ethtool -K {c.name}-eth0 {OFFLOAD_FEATURES}"),
+                      container_list))
+
+def wait_port_open(node, ip, port, timeout):
+    """Poll ip:port from node's shell every 250 ms until it accepts a TCP connection.
+    Returns False if it did not within timeout seconds (just sleeps when node is None).
+    Each connect attempt is capped at 1 s, so a dropped SYN cannot overrun timeout."""
+    if node is None:
+        time.sleep(timeout)
+        return False
+    probe = f"timeout 1 bash -c '</dev/tcp/{ip}/{port}' 2>/dev/null || nc -z -w 1 {ip} {port} 2>/dev/null"
+    out = node.cmd(f"end=$(($(date +%s)+{int(timeout)})); while :; do "
+                   f"if ({probe}); then echo READY; break; fi; "
+                   f"[ $(date +%s) -ge $end ] && break; sleep 0.25; done")
+    return 'READY' in out
+
 def log_command(node_name, command):
     """Log executed command to results"""
     global executed_commands
@@ -745,11 +797,10 @@ def start_fl(container_list_full, _routers):
         return f"--{key} {value}" if value is not None else None
 
     def get_args(file):
-        with open(f"./{folder_name}/{file}", "r") as stream:
-            try:
-                config = yaml.safe_load(stream)
-            except yaml.YAMLError as exc:
-                error(exc)
+        try:
+            config = _load_yaml(f"./{folder_name}/{file}")
+        except yaml.YAMLError as exc:
+            error(exc)
         args = [
             add_arg("protocol", config.get('protocol', protocol)),
             add_arg("rounds", config.get('rounds')),
@@ -830,19 +881,20 @@ def start_fl(container_list_full, _routers):
             ps_cls = container_class[0]
             client_list = container_list[1:]
             client_class = container_class[1:]
+            # Idle client used to probe server/broker readiness before the launches
+            prober = client_list[0] if client_list else None
 
             arguments = get_args(file_name)
             info(f"args: {arguments}\n")
             name_without_extension = file_name.rsplit(".", 1)[0]
+            # Common prefix of every log/pcap written inside the containers
+            out_prefix = f"/app/saved_output/{name_without_extension}"
             
             info('*** Running TRAFFIC DUMP from Parameter Server\n')
-
-            offload_commands = "gro off tx off rx off lro off gso off tso off sg off rxvlan off txvlan off rxhash off ufo off"
             
             # Conditional tcpdump
             if enable_tcpdump:
-                ps.cmd(f"ethtool -K eth0 {offload_commands} && ethtool -K {ps.name}-eth0 {offload_commands}")
-                tcpdump_cmd = f"tcpdump -i any -w /app/saved_output/{name_without_extension}_ps_{ps.name}-eth0.pcap &"
+                tcpdump_cmd = f"tcpdump -i any -w {out_prefix}_ps_{ps.name}-eth0.pcap &"
                 ps.cmd(tcpdump_cmd)
                 log_command(ps.name, tcpdump_cmd)
                 info(f"*** tcpdump enabled on {ps.name}\n")
@@ -869,7 +921,7 @@ def start_fl(container_list_full, _routers):
                                 mqtt_broker_container.cmd(broker_cmd)
                                 log_command('mqtt_broker', broker_cmd)
                     
-                    time.sleep(5)
+                    wait_port_open(prober, broker_ip, 1883, timeout=5)
                     info(f"*** MQTT broker running at {broker_ip}\n")
                     
                 elif broker_location == 'ps':
@@ -882,11 +934,11 @@ def start_fl(container_list_full, _routers):
                                 log_command(ps.name, broker_cmd)
                     else:
                         info(f"*** Using default mosquitto broker\n")
-                        mosquitto_cmd = f"mosquitto -c /etc/mosquitto/mosquitto.conf -v > /app/saved_output/{name_without_extension}_mosquitto_{ps.name}.log 2>&1 &"
+                        mosquitto_cmd = f"mosquitto -c /etc/mosquitto/mosquitto.conf -v > {out_prefix}_mosquitto_{ps.name}.log 2>&1 &"
                         ps.cmd(mosquitto_cmd)
                         log_command(ps.name, mosquitto_cmd)
                     
-                    time.sleep(5)
+                    wait_port_open(prober, broker_ip, 1883, timeout=5)
             
             info(f'*** Running FL Parameter Server at ip {ps_cls.address_2}\n')
             
@@ -908,21 +960,24 @@ def start_fl(container_list_full, _routers):
             else:
                 cmd = f"python3 -u run.py --protocol {protocol} --mode Server --port {server_port} --ip {srv_addr} --index {ps_cls.id} {' '.join(arguments)}"
             
-            cmd += f" > /app/saved_output/{name_without_extension}_ps_{ps.name}.log 2>&1"
+            cmd += f" > {out_prefix}_ps_{ps.name}.log 2>&1"
             ps.sendCmd(cmd)
             log_command(ps.name, cmd)
-            time.sleep(20)
+            if enable_mqtt or protocol.lower() in UDP_PROTOCOLS:
+                # The PS talks through the broker, or listens on UDP: no TCP port to probe
+                time.sleep(20)
+            elif wait_port_open(prober, ps_cls.address_2, server_port, timeout=20):
+                info(f"*** Parameter Server is accepting connections on port {server_port}\n")
 
             info('*** Running FL Clients\n')
-            for cli, cli_cls in zip(client_list, client_class):
-                if enable_tcpdump and not first:
-                    tcpdump_client_cmd = f"tcpdump -i any -w /app/saved_output/{name_without_extension}_{cli.name}_{protocol}.pcap &"
-                    cli.cmd(tcpdump_client_cmd)
-                    log_command(cli.name, tcpdump_client_cmd)
-                    first = True
-                
-                cli.cmd(f"ethtool -K {cli.name}-eth0 {offload_commands}")
-                
+            if enable_tcpdump and not first and client_list:
+                cli = client_list[0]
+                tcpdump_client_cmd = f"tcpdump -i any -w {out_prefix}_{cli.name}_{protocol}.pcap &"
+                cli.cmd(tcpdump_client_cmd)
+                log_command(cli.name, tcpdump_client_cmd)
+                first = True
+            
+            def launch_client(cli, cli_cls):
                 # Use custom command if specified
                 if cli_cls.custom_command:
                     cmd = render_command_template(
@@ -938,16 +993,25 @@ def start_fl(container_list_full, _routers):
                 
                 profile_str = get_container_profile_string(cli_cls)
                 
-                cmd += f" > /app/saved_output/{name_without_extension}_cli_{cli.name}__{profile_str}.log 2>&1"
+                cmd += f" > {out_prefix}_cli_{cli.name}__{profile_str}.log 2>&1"
                 cli.sendCmd(cmd)
-                log_command(cli.name, cmd)
+                return cmd
+            
+            # Every client has its own shell, so the launches are sent concurrently
+            # (waitOutput() below still runs on this thread)
+            if client_list:
+                with ThreadPoolExecutor(max_workers=min(32, len(client_list))) as pool:
+                    client_cmds = list(pool.map(launch_client, client_list, client_class))
+                for cli, cmd in zip(client_list, client_cmds):
+                    log_command(cli.name, cmd)
 
             
-            # Save command log to file
-            log_file = f"{output_dir_name}/commands_executed.json"
+            # Save command log to file, one JSON object per line (same format
+            # as the ApplicationRunner command log)
+            log_file = f"{output_dir_name}/commands_executed.jsonl"
             os.makedirs(os.path.dirname(log_file), exist_ok=True)
             with open(log_file, 'w') as f:
-                json.dump(executed_commands, f, indent=2)
+                f.writelines(json.dumps(entry, separators=(',', ':')) + '\n' for entry in executed_commands)
             info(f"*** Commands logged to {log_file}\n")
             
             if resource_manager:
@@ -1005,6 +1069,7 @@ def main():
         net.start()
 
         add_routing(container_list_full)
+        disable_offloading(container_list)
 
         info('*** Testing connectivity\n')
 
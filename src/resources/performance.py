@@ -3,13 +3,23 @@ import json
 import os
 import math
 import psutil
+import sys
 import warnings
 from typing import List, Dict, Any, Sequence, Union, Optional, Tuple
 import numpy as np
 from dataclasses import dataclass, field
 
+try:
+    import numba
+except ImportError:
+    numba = None
 
-@dataclass
+
+# Per-instance __slots__ for dataclasses (dataclass slots need Python 3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class CoreAllocation:
     """Tracks allocation state for a single CPU core."""
     core_id: int
@@ -912,6 +922,61 @@ class ContainerResourceManager:
         self._planned = False
 
 
+# =============================================================================
+# Router link addressing
+# =============================================================================
+
+def router_pair_links(ids):
+    """
+    (i, j, link_id) rows for every router pair i < j; the link subnet of the
+    pair is 10.<link_id>.0.0/24. link_id is the two router ids concatenated in
+    string order, e.g. (1, 12) -> 112 and (2, 10) -> 102, computed on the
+    integers. Shared by emulation.py and ContainernetManager so both entry
+    points address links the same way.
+    
+    Note: the rule is kept as-is for compatibility with existing topologies;
+    it is not injective ((1, 12) and (11, 2) both give 112) and ids above
+    255 do not fit an IPv4 octet, so it only yields valid, distinct subnets
+    for small router counts.
+    """
+    n = ids.shape[0]
+    out = np.empty((n * (n - 1) // 2, 3), np.int64)
+    k = 0
+    for i in range(n):
+        a = ids[i]
+        pa = 1  # place value of a's leading digit
+        while pa * 10 <= a:
+            pa *= 10
+        for j in range(i + 1, n):
+            b = ids[j]
+            pb = 1
+            while pb * 10 <= b:
+                pb *= 10
+            # Compare the digit strings on their common length; on a tie the
+            # shorter one sorts first
+            if pa >= pb:
+                prefix = a // (pa // pb)
+                a_first = prefix < b
+            else:
+                prefix = b // (pb // pa)
+                a_first = a <= prefix
+            if a_first:
+                link_id = a * pb * 10 + b
+            else:
+                link_id = b * pa * 10 + a
+            out[k, 0] = i
+            out[k, 1] = j
+            out[k, 2] = link_id
+            k += 1
+    return out
+
+if numba is not None:
+    # No on-disk cache: this module is imported both as resources.performance
+    # (emulation.py) and src.resources.performance, and a cached entry is tied
+    # to the module name that compiled it
+    router_pair_links = numba.njit(router_pair_links)
+
+
 # =============================================================================
 # Example usage
 # =============================================================================